@@ -13,10 +13,8 @@
 #  of the state-space graph using networkx."
 # =============================================================================
 
-from search import Problem, breadth_first_graph_search, depth_first_graph_search, best_first_graph_search
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-import networkx as nx
+from search import (Problem, breadth_first_graph_search, depth_first_graph_search, best_first_graph_search,
+                    bidirectional_breadth_first_search)
 from collections import deque
 
 
@@ -26,9 +24,9 @@ class WaterJugProblem(Problem):
 
     State: (a, b)  where  a = liters in Jug A,  b = liters in Jug B
     Initial state : (0, 0)   – both jugs empty
-    Goal state    : a == 2   – exactly 2 liters in Jug A
+    Goal state    : a == TARGET – exactly TARGET liters in Jug A (2 by default)
 
-    Jug capacities:
+    Jug capacities (by default):
       Jug A – 4 liters
       Jug B – 3 liters
 
@@ -43,9 +41,14 @@ class WaterJugProblem(Problem):
 
     CAP_A = 4   # Jug A capacity (liters)
     CAP_B = 3   # Jug B capacity (liters)
+    TARGET = 2  # liters wanted in Jug A
 
-    def __init__(self):
-        super().__init__(initial=(0, 0))  # goal checked dynamically
+    def __init__(self, cap_a=CAP_A, cap_b=CAP_B, target=TARGET):
+        # Other capacities and targets give the variants of the puzzle
+        self.CAP_A, self.CAP_B, self.TARGET = cap_a, cap_b, target
+        # goal_test checks A == TARGET directly; the goal states are listed
+        # for searches that start from the goal
+        super().__init__(initial=(0, 0), goal=[(target, b) for b in range(cap_b + 1)])
 
     def actions(self, state):
         """Return all valid actions in the current state."""
@@ -78,22 +81,39 @@ class WaterJugProblem(Problem):
             return (a + pour, b - pour)
 
     def goal_test(self, state):
-        """Goal: exactly 2 liters in Jug A."""
-        return state[0] == 2
+        """Goal: exactly TARGET liters in Jug A."""
+        return state[0] == self.TARGET
+
+    def predecessors(self, state):
+        """
+        Return (action, previous state) pairs with result(previous, action) == state.
+        Filling, emptying and pouring are not undone by a single action, so
+        the candidates are the states that keep one jug of state (fill,
+        empty) or hold the same total amount (pour).
+        """
+        a, b = state
+        total = a + b
+        candidates = ({(x, b) for x in range(self.CAP_A + 1)} |
+                      {(a, y) for y in range(self.CAP_B + 1)} |
+                      {(x, total - x) for x in range(self.CAP_A + 1) if 0 <= total - x <= self.CAP_B})
+        return [(action, previous) for previous in sorted(candidates) if previous != state
+                for action in self.actions(previous) if self.result(previous, action) == state]
 
     def h(self, node):
         """
         Heuristic: Manhattan-like distance to goal.
-        How far is Jug A from 2 liters?
+        How far is Jug A from TARGET liters?
         """
         a, b = node.state
-        return abs(a - 2)
+        return abs(a - self.TARGET)
 
 
 # ── Helper: build full state graph ────────────────────────────────────────────
 
 def build_state_graph(problem):
     """BFS over all reachable states; return a networkx DiGraph."""
+    import networkx as nx
+
     G = nx.DiGraph()
     initial = problem.initial
     G.add_node(initial, layer=0)
@@ -115,112 +135,125 @@ def build_state_graph(problem):
 
 # ── Solve ──────────────────────────────────────────────────────────────────────
 
-problem = WaterJugProblem()
-
-print("=" * 50)
-print("  Water Jug Problem")
-print(f"  Jug A capacity : {problem.CAP_A} L")
-print(f"  Jug B capacity : {problem.CAP_B} L")
-print(f"  Initial state  : {problem.initial}  (A=0L, B=0L)")
-print(f"  Goal           : A == 2 L")
-print("=" * 50)
-
-# BFS – guarantees fewest steps
-bfs_node = breadth_first_graph_search(problem)
-bfs_solution = bfs_node.solution()
-print(f"\nBFS solution  ({len(bfs_solution)} steps): {bfs_solution}")
-
-# Best-first (greedy) – uses heuristic h(n)
-bef_node = best_first_graph_search(problem, lambda n: problem.h(n))
-bef_solution = bef_node.solution()
-print(f"Best-first    ({len(bef_solution)} steps): {bef_solution}")
-
-# Step-by-step trace (BFS solution)
-print("\nStep-by-step (BFS):")
-state = problem.initial
-print(f"  Start : A={state[0]}L, B={state[1]}L")
-for action in bfs_solution:
-    state = problem.result(state, action)
-    print(f"  {action:<12}: A={state[0]}L, B={state[1]}L")
-
-# ── Build & draw state-space graph ────────────────────────────────────────────
-
-G = build_state_graph(problem)
-print(f"\nState-space graph: {G.number_of_nodes()} states, {G.number_of_edges()} transitions")
-
-# Recover solution path nodes
-solution_path = []
-node = bfs_node
-while node:
-    solution_path.append(node.state)
-    node = node.parent
-solution_path.reverse()
-solution_set = set(solution_path)
-
-# Layout by BFS depth layer
-pos = nx.multipartite_layout(G, subset_key='layer', align='vertical', scale=2)
-
-# Node colours
-node_colors = []
-for s in G.nodes():
-    if s == problem.initial:
-        node_colors.append('#2ecc71')   # green  – initial
-    elif problem.goal_test(s):
-        node_colors.append('#e74c3c')   # red    – goal
-    elif s in solution_set:
-        node_colors.append('#f39c12')   # orange – solution path
-    else:
-        node_colors.append('#aed6f1')   # blue   – explored
-
-fig, ax = plt.subplots(figsize=(16, 10))
-
-nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=900, ax=ax)
-
-# All edges (grey)
-nx.draw_networkx_edges(G, pos, edge_color='#bdc3c7', arrows=True,
-                       arrowsize=12, width=0.7, ax=ax)
-
-# Solution-path edges (red)
-sol_edges = list(zip(solution_path[:-1], solution_path[1:]))
-nx.draw_networkx_edges(
-    G, pos, edgelist=sol_edges,
-    edge_color='#c0392b', width=3,
-    arrows=True, arrowsize=18, ax=ax,
-    connectionstyle='arc3,rad=0.15'
-)
-
-# Node labels: (A, B) liters
-labels = {s: f"A={s[0]}L\nB={s[1]}L" for s in G.nodes()}
-nx.draw_networkx_labels(G, pos, labels=labels, font_size=8, ax=ax)
-
-# Edge action labels on solution path
-edge_labels = {(u, v): G[u][v]['label'] for u, v in sol_edges}
-nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels,
-                             font_size=7, font_color='#c0392b', ax=ax)
-
-# Step numbers on solution path
-for step, s in enumerate(solution_path):
-    x, y = pos[s]
-    ax.text(x, y + 0.18, f"step {step}",
-            ha='center', va='bottom', fontsize=7,
-            fontweight='bold', color='#2c3e50')
-
-legend_elements = [
-    mpatches.Patch(color='#2ecc71', label='Initial state (0L, 0L)'),
-    mpatches.Patch(color='#e74c3c', label='Goal state (A = 2L)'),
-    mpatches.Patch(color='#f39c12', label='Solution path (BFS)'),
-    mpatches.Patch(color='#aed6f1', label='Other reachable states'),
-]
-ax.legend(handles=legend_elements, loc='lower right', fontsize=9)
-ax.set_title(
-    f"Water Jug Problem – State-Space Graph (BFS)\n"
-    f"Jug A: {problem.CAP_A}L  |  Jug B: {problem.CAP_B}L  |  "
-    f"Goal: A=2L  |  BFS solution: {len(bfs_solution)} steps\n"
-    f"{G.number_of_nodes()} states  |  {G.number_of_edges()} transitions",
-    fontsize=13
-)
-ax.axis('off')
-plt.tight_layout()
-plt.savefig('water_jug_graph.png', dpi=150, bbox_inches='tight')
-print("Graph saved → water_jug_graph.png")
-plt.show()
+def main():
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as mpatches
+    import networkx as nx
+
+    problem = WaterJugProblem()
+
+    print("=" * 50)
+    print("  Water Jug Problem")
+    print(f"  Jug A capacity : {problem.CAP_A} L")
+    print(f"  Jug B capacity : {problem.CAP_B} L")
+    print(f"  Initial state  : {problem.initial}  (A=0L, B=0L)")
+    print(f"  Goal           : A == {problem.TARGET} L")
+    print("=" * 50)
+
+    # BFS – guarantees fewest steps
+    bfs_node = breadth_first_graph_search(problem)
+    bfs_solution = bfs_node.solution()
+    print(f"\nBFS solution  ({len(bfs_solution)} steps): {bfs_solution}")
+
+    # Best-first (greedy) – uses heuristic h(n)
+    bef_node = best_first_graph_search(problem, lambda n: problem.h(n))
+    bef_solution = bef_node.solution()
+    print(f"Best-first    ({len(bef_solution)} steps): {bef_solution}")
+
+    # Bidirectional BFS – also fewest steps, meeting halfway from the goal states
+    bibfs_solution = bidirectional_breadth_first_search(problem).solution()
+    print(f"Bidir. BFS    ({len(bibfs_solution)} steps): {bibfs_solution}")
+
+    # Step-by-step trace (BFS solution)
+    print("\nStep-by-step (BFS):")
+    state = problem.initial
+    print(f"  Start : A={state[0]}L, B={state[1]}L")
+    for action in bfs_solution:
+        state = problem.result(state, action)
+        print(f"  {action:<12}: A={state[0]}L, B={state[1]}L")
+
+    # ── Build & draw state-space graph ────────────────────────────────────────────
+
+    G = build_state_graph(problem)
+    print(f"\nState-space graph: {G.number_of_nodes()} states, {G.number_of_edges()} transitions")
+
+    # Recover solution path nodes
+    solution_path = []
+    node = bfs_node
+    while node:
+        solution_path.append(node.state)
+        node = node.parent
+    solution_path.reverse()
+    solution_set = set(solution_path)
+
+    # Layout by BFS depth layer
+    pos = nx.multipartite_layout(G, subset_key='layer', align='vertical', scale=2)
+
+    # Node colours
+    node_colors = []
+    for s in G.nodes():
+        if s == problem.initial:
+            node_colors.append('#2ecc71')   # green  – initial
+        elif problem.goal_test(s):
+            node_colors.append('#e74c3c')   # red    – goal
+        elif s in solution_set:
+            node_colors.append('#f39c12')   # orange – solution path
+        else:
+            node_colors.append('#aed6f1')   # blue   – explored
+
+    fig, ax = plt.subplots(figsize=(16, 10))
+
+    nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=900, ax=ax)
+
+    # All edges (grey)
+    nx.draw_networkx_edges(G, pos, edge_color='#bdc3c7', arrows=True,
+                           arrowsize=12, width=0.7, ax=ax)
+
+    # Solution-path edges (red)
+    sol_edges = list(zip(solution_path[:-1], solution_path[1:]))
+    nx.draw_networkx_edges(
+        G, pos, edgelist=sol_edges,
+        edge_color='#c0392b', width=3,
+        arrows=True, arrowsize=18, ax=ax,
+        connectionstyle='arc3,rad=0.15'
+    )
+
+    # Node labels: (A, B) liters
+    labels = {s: f"A={s[0]}L\nB={s[1]}L" for s in G.nodes()}
+    nx.draw_networkx_labels(G, pos, labels=labels, font_size=8, ax=ax)
+
+    # Edge action labels on solution path
+    edge_labels = {(u, v): G[u][v]['label'] for u, v in sol_edges}
+    nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels,
+                                 font_size=7, font_color='#c0392b', ax=ax)
+
+    # Step numbers on solution path
+    for step, s in enumerate(solution_path):
+        x, y = pos[s]
+        ax.text(x, y + 0.18, f"step {step}",
+                ha='center', va='bottom', fontsize=7,
+                fontweight='bold', color='#2c3e50')
+
+    legend_elements = [
+        mpatches.Patch(color='#2ecc71', label='Initial state (0L, 0L)'),
+        mpatches.Patch(color='#e74c3c', label=f'Goal state (A = {problem.TARGET}L)'),
+        mpatches.Patch(color='#f39c12', label='Solution path (BFS)'),
+        mpatches.Patch(color='#aed6f1', label='Other reachable states'),
+    ]
+    ax.legend(handles=legend_elements, loc='lower right', fontsize=9)
+    ax.set_title(
+        f"Water Jug Problem – State-Space Graph (BFS)\n"
+        f"Jug A: {problem.CAP_A}L  |  Jug B: {problem.CAP_B}L  |  "
+        f"Goal: A={problem.TARGET}L  |  BFS solution: {len(bfs_solution)} steps\n"
+        f"{G.number_of_nodes()} states  |  {G.number_of_edges()} transitions",
+        fontsize=13
+    )
+    ax.axis('off')
+    plt.tight_layout()
+    plt.savefig('water_jug_graph.png', dpi=150, bbox_inches='tight')
+    print("Graph saved → water_jug_graph.png")
+    plt.show()
+
+
+if __name__ == '__main__':
+    main()
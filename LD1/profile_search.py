@@ -0,0 +1,164 @@
+"""
+Profile a searcher of search.py on one problem.
+
+Run from the LD1 directory:
+    python profile_search.py astar_search --puzzle 8,6,7,2,5,4,3,0,1
+    python profile_search.py depth_first_graph_search --nqueens 20 --only cpu
+    python profile_search.py uniform_cost_search --country Lithuania --start Vilnius --goal Nida
+
+--puzzle takes an EightPuzzle state (an NPuzzle one for 16, 25, ... tiles),
+0 being the blank. The search is run once for each of:
+    cpu     cProfile; hot functions sorted by --sort go to <output>.cprofile.txt
+            and the raw statistics to <output>.prof (for pstats or snakeviz)
+    memory  tracemalloc; the peak and the allocations by line at the largest
+            snapshot taken go to <output>.memory.txt
+    stacks  the call stack sampled every --interval seconds of CPU time, in the
+            collapsed format of flamegraph.pl and speedscope, to <output>.collapsed
+Each run is separate, so one tool does not distort the others.
+"""
+
+import argparse
+import cProfile
+import collections
+import io
+import math
+import os
+import pstats
+import signal
+import sys
+import time
+import tracemalloc
+
+import maps
+import search
+from search import Node, EightPuzzle, NPuzzle, GraphProblem, NQueensProblem
+
+
+def make_problem(args):
+    """The problem given on the command line."""
+    if args.puzzle:
+        tiles = tuple(int(tile) for tile in args.puzzle.split(','))
+        if len(tiles) == 9:
+            return EightPuzzle(tiles)
+        return NPuzzle(tiles, width=math.isqrt(len(tiles)))
+    if args.nqueens:
+        return NQueensProblem(args.nqueens)
+    maps.romania_map, maps.romania_map_start, maps.romania_map_goal = None, args.start, args.goal
+    search.switch_country_map(args.country)
+    return GraphProblem(maps.romania_map_start, maps.romania_map_goal, maps.romania_map)
+
+
+def profile_cpu(searcher, problem, output, sort='cumulative', limit=30):
+    """Run searcher under cProfile; write the report and the raw statistics."""
+    profiler = cProfile.Profile()
+    node = profiler.runcall(searcher, problem)
+    profiler.dump_stats(output + '.prof')
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats(sort).print_stats(limit)
+    with open(output + '.cprofile.txt', 'w') as file:
+        file.write(report.getvalue())
+    return node
+
+
+def profile_memory(searcher, problem, output, interval=0.01, limit=30):
+    """Run searcher under tracemalloc. A snapshot replaces the last one
+    whenever the traced memory, sampled every interval seconds of CPU time,
+    has grown by a tenth since; the last snapshot stands for the peak, whose
+    exact size tracemalloc reports separately."""
+    size, snapshot, busy = 0, None, False
+
+    def sample(signum, frame):
+        nonlocal size, snapshot, busy
+        current = tracemalloc.get_traced_memory()[0]
+        if not busy and current > 1.1 * size:
+            busy, snapshot = True, None
+            size, snapshot = current, tracemalloc.take_snapshot()
+            busy = False
+
+    tracemalloc.start()
+    previous = signal.signal(signal.SIGPROF, sample)
+    signal.setitimer(signal.ITIMER_PROF, interval, interval)
+    try:
+        node = searcher(problem)
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, previous)
+        peak = tracemalloc.get_traced_memory()[1]
+        if snapshot is None:
+            size, snapshot = tracemalloc.get_traced_memory()[0], tracemalloc.take_snapshot()
+        tracemalloc.stop()
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                       tracemalloc.Filter(False, __file__)])
+    with open(output + '.memory.txt', 'w') as file:
+        file.write('peak {:,} bytes; largest snapshot {:,} bytes, by line:\n'.format(peak, size))
+        for stat in snapshot.statistics('lineno')[:limit]:
+            file.write('{}\n'.format(stat))
+    return node
+
+
+def profile_stacks(searcher, problem, output, interval=0.001):
+    """Run searcher while sampling its call stack on SIGPROF; write one line
+    per distinct stack, outermost frame first, with the number of samples."""
+    counts = collections.Counter()
+    top = sys._getframe()
+
+    def sample(signum, frame):
+        names = []
+        while frame is not None and frame is not top:
+            code = frame.f_code
+            names.append('{}:{}'.format(os.path.basename(code.co_filename), code.co_name))
+            frame = frame.f_back
+        counts[';'.join(reversed(names))] += 1
+
+    previous = signal.signal(signal.SIGPROF, sample)
+    signal.setitimer(signal.ITIMER_PROF, interval, interval)
+    try:
+        node = searcher(problem)
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, previous)
+    with open(output + '.collapsed', 'w') as file:
+        for stack, count in counts.most_common():
+            file.write('{} {}\n'.format(stack, count))
+    return node
+
+
+def report(name, node, seconds):
+    if isinstance(node, Node):
+        print('{:<7} {:.3f} s, solution of {} steps costing {}'.format(name, seconds, node.depth, node.path_cost))
+    else:
+        print('{:<7} {:.3f} s, returned {!r}'.format(name, seconds, node))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile a searcher of search.py on one problem')
+    parser.add_argument('searcher', help='name of a search function in search.py, like astar_search')
+    spec = parser.add_mutually_exclusive_group(required=True)
+    spec.add_argument('--puzzle', help='comma-separated tiles of an EightPuzzle (or NPuzzle) state')
+    spec.add_argument('--nqueens', type=int, metavar='N', help='NQueensProblem of size N')
+    spec.add_argument('--country', help='a country of switch_country_map')
+    parser.add_argument('--start', help='start city on the country map (default: the map\'s own)')
+    parser.add_argument('--goal', help='goal city on the country map (default: the map\'s own)')
+    parser.add_argument('--only', action='append', choices=['cpu', 'memory', 'stacks'],
+                        help='only these profiles (default: all three)')
+    parser.add_argument('--sort', default='cumulative', help='pstats sort key of the cpu report')
+    parser.add_argument('--limit', type=int, default=30, help='lines in the cpu and memory reports')
+    parser.add_argument('--interval', type=float, default=0.001, help='seconds between stack samples')
+    parser.add_argument('--output', help='path prefix of the reports (default: profile_<searcher>)')
+    args = parser.parse_args()
+    searcher = getattr(search, args.searcher, None)
+    if not callable(searcher):
+        parser.error('search.py has no searcher {}'.format(args.searcher))
+    output = args.output or 'profile_' + args.searcher
+    runs = {'cpu': lambda problem: profile_cpu(searcher, problem, output, args.sort, args.limit),
+            'memory': lambda problem: profile_memory(searcher, problem, output, limit=args.limit),
+            'stacks': lambda problem: profile_stacks(searcher, problem, output, args.interval)}
+    for name in args.only or runs:
+        problem = make_problem(args)
+        start = time.perf_counter()
+        node = runs[name](problem)
+        report(name, node, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
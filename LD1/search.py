@@ -7,12 +7,24 @@ functions.
 """
 
 import sys
-from collections import deque
+import functools
+import heapq
+from collections import defaultdict, deque
 
 from utils import *
 
 import math
 import decimal
+import itertools
+import mmap
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import struct
+import time
+import zlib
+from array import array
 
 import random
 
@@ -54,6 +66,12 @@ class Problem:
         else:
             return state == self.goal
 
+    def predecessors(self, state):
+        """Return the (action, previous state) pairs for which
+        result(previous state, action) is state. Used by searches that work
+        backward from the goal, like bidirectional_breadth_first_search."""
+        raise NotImplementedError
+
     def path_cost(self, c, state1, action, state2):
         """Return the cost of a solution path that arrives at state2 from
         state1 via action, assuming cost c to get up to state1. If the problem
@@ -79,7 +97,14 @@ class Node:
     the total path_cost (also known as g) to reach the node. Other functions
     may add an f and h value; see best_first_graph_search and astar_search for
     an explanation of how the f and h values are handled. You will not need to
-    subclass this class."""
+    subclass this class.
+
+    Nodes use fixed __slots__ instead of a per-instance __dict__, which takes
+    a node with f and h set from 136 to 88 bytes (about 35% less). The f and h
+    slots start out unset, so memoize(f, 'f') and memoize(h, 'h') still fill
+    them in on first use."""
+
+    __slots__ = ('state', 'parent', 'action', 'path_cost', 'depth', 'f', 'h')
 
     def __init__(self, state, parent=None, action=None, path_cost=0):
         """Create a search tree Node, derived from a parent by an action."""
@@ -87,9 +112,7 @@ class Node:
         self.parent = parent
         self.action = action
         self.path_cost = path_cost
-        self.depth = 0
-        if parent:
-            self.depth = parent.depth + 1
+        self.depth = 0 if parent is None else parent.depth + 1
 
     def __repr__(self):
         return "<Node {}>".format(self.state)
@@ -115,7 +138,7 @@ class Node:
     def path(self):
         """Return a list of nodes forming the path from the root to this node."""
         node, path_back = self, []
-        while node:
+        while node is not None:
             path_back.append(node)
             node = node.parent
         return list(reversed(path_back))
@@ -136,6 +159,273 @@ class Node:
         return hash(self.state)
 
 
+# ______________________________________________________________________________
+# Frontiers
+
+
+class Frontier:
+    """A queue of nodes waiting to be expanded by a graph search. Next to the
+    queue itself it keeps an index from state to node, so that `child in
+    frontier` is a hash lookup instead of a linear scan over the queue.
+    Subclasses decide the order in which nodes are popped."""
+
+    def __init__(self, nodes=()):
+        self.index = {}
+        self.extend(nodes)
+
+    def append(self, node):
+        raise NotImplementedError
+
+    def pop(self):
+        raise NotImplementedError
+
+    def extend(self, nodes):
+        for node in nodes:
+            self.append(node)
+
+    def __contains__(self, node):
+        return node.state in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+
+class FIFOFrontier(Frontier):
+    """First-in first-out frontier, as used by breadth-first search."""
+
+    def __init__(self, nodes=()):
+        self.queue = deque()
+        super().__init__(nodes)
+
+    def append(self, node):
+        self.queue.append(node)
+        self.index[node.state] = node
+
+    def pop(self):
+        node = self.queue.popleft()
+        self.index.pop(node.state, None)
+        return node
+
+
+class LIFOFrontier(Frontier):
+    """Last-in first-out frontier (a stack), as used by depth-first search."""
+
+    def __init__(self, nodes=()):
+        self.stack = []
+        super().__init__(nodes)
+
+    def append(self, node):
+        self.stack.append(node)
+        self.index[node.state] = node
+
+    def pop(self):
+        node = self.stack.pop()
+        self.index.pop(node.state, None)
+        return node
+
+
+class PriorityFrontier(Frontier):
+    """Frontier that pops the node with the minimum f(node) first. Like
+    utils.PriorityQueue, frontier[node] gives the f value stored for the
+    node's state and del frontier[node] removes it.
+
+    Removal is lazy: del only drops the state from the index, and the old heap
+    entry is skipped when it reaches the top. So replacing a frontier node by
+    a cheaper one (del frontier[child]; frontier.append(child)) is a
+    decrease-key in O(log n) instead of a linear removal plus re-heapify."""
+
+    def __init__(self, f, nodes=()):
+        self.f = f
+        self.heap = []
+        self.priority = {}
+        super().__init__(nodes)
+
+    def append(self, node):
+        value = self.f(node)
+        heapq.heappush(self.heap, (value, node))
+        self.index[node.state] = node
+        self.priority[node.state] = value
+
+    def pop(self):
+        heap, index = self.heap, self.index
+        while heap:
+            node = heapq.heappop(heap)[1]
+            if index.get(node.state) is node:
+                del index[node.state]
+                del self.priority[node.state]
+                return node
+        raise IndexError('pop from an empty frontier')
+
+    def __getitem__(self, node):
+        return self.priority[node.state]
+
+    def __delitem__(self, node):
+        del self.index[node.state]
+        del self.priority[node.state]
+        if len(self.heap) > 2 * len(self.index) + 64:
+            # Too many stale entries: drop them so the heap stays O(live).
+            index = self.index
+            self.heap = [entry for entry in self.heap if index.get(entry[1].state) is entry[1]]
+            heapq.heapify(self.heap)
+
+
+class BucketFrontier(Frontier):
+    """Priority frontier for problems whose f values are small non-negative
+    integers, such as unit-cost puzzles with integer heuristics. Nodes are
+    kept in one bucket per f value, so push and pop cost O(1) instead of the
+    O(log n) comparisons of a heap (each of which may compare whole states
+    through Node.__lt__). Inside a bucket the deepest node is popped first,
+    and of nodes at one depth the first pushed, which keeps the solutions
+    that the heap found for NQueensProblem.
+
+    An f value that is not an int in [0, limit) goes to a small overflow heap,
+    so the frontier stays correct for any f. Deletion is lazy, as in
+    PriorityFrontier."""
+
+    def __init__(self, f, nodes=(), limit=256):
+        self.f = f
+        self.limit = limit
+        self.buckets = []  # buckets[value][depth] -> queue of nodes
+        self.lowest = 0  # no live node sits in a bucket below this one
+        self.overflow = []
+        self.priority = {}
+        super().__init__(nodes)
+
+    def append(self, node):
+        value = self.f(node)
+        self.index[node.state] = node
+        self.priority[node.state] = value
+        if type(value) is int and 0 <= value < self.limit:
+            buckets = self.buckets
+            while len(buckets) <= value:
+                buckets.append([])
+            bucket = buckets[value]
+            while len(bucket) <= node.depth:
+                bucket.append(deque())
+            bucket[node.depth].append(node)
+            if value < self.lowest:
+                self.lowest = value
+        else:
+            heapq.heappush(self.overflow, (value, node))
+
+    def live(self, node, value):
+        """Is node still the frontier node for its state, with this f value?"""
+        return self.index.get(node.state) is node and self.priority[node.state] == value
+
+    def pop(self):
+        buckets, overflow = self.buckets, self.overflow
+        while self.index:
+            while overflow and not self.live(overflow[0][1], overflow[0][0]):
+                heapq.heappop(overflow)
+            value = self.lowest
+            while value < len(buckets) and not buckets[value]:
+                value += 1
+            self.lowest = value
+            if value == len(buckets) or (overflow and overflow[0][0] < value):
+                node = heapq.heappop(overflow)[1]
+            else:
+                bucket = buckets[value]
+                node = bucket[-1].popleft()
+                while bucket and not bucket[-1]:
+                    bucket.pop()
+                if not self.live(node, value):
+                    continue
+            del self.index[node.state]
+            del self.priority[node.state]
+            return node
+        raise IndexError('pop from an empty frontier')
+
+    def __getitem__(self, node):
+        return self.priority[node.state]
+
+    def __delitem__(self, node):
+        del self.index[node.state]
+        del self.priority[node.state]
+
+
+def priority_frontier(f, node, problem, limit=256):
+    """Return the frontier best_first_graph_search should use on problem,
+    starting with node: a BucketFrontier when the problem has unit step
+    costs (it keeps Problem.path_cost) and f(node) is a small non-negative
+    int, as with an integer heuristic; else a PriorityFrontier. The root's f
+    alone is not enough: uniform-cost search starts at 0 on any problem."""
+    value = f(node)
+    if unit_step_costs(problem) and type(value) is int and 0 <= value < limit:
+        return BucketFrontier(f, [node], limit)
+    return PriorityFrontier(f, [node])
+
+
+def unit_step_costs(problem):
+    """Does problem (or the problem an InstrumentedProblem, HookedProblem or
+    BudgetedProblem wraps) keep the unit step cost of Problem.path_cost?"""
+    while isinstance(problem, (InstrumentedProblem, HookedProblem, BudgetedProblem)):
+        problem = problem.problem
+    return type(problem).path_cost is Problem.path_cost
+
+
+# ______________________________________________________________________________
+# Permutation ranking and ranked explored sets
+
+
+def rank_permutation(perm):
+    """Return the Lehmer-code rank of a permutation of 0..n-1: its index in
+    lexicographic order, in [0, n!)."""
+    n, rank, seen = len(perm), 0, 0
+    for v in perm:
+        # The next digit of the Lehmer code: the values below v not used yet
+        bit = 1 << v
+        rank = rank * n + v - (seen & (bit - 1)).bit_count()
+        seen |= bit
+        n -= 1
+    return rank
+
+
+def unrank_permutation(rank, n):
+    """Return the permutation of 0..n-1, as a tuple, whose rank_permutation is rank."""
+    digits = []
+    for base in range(1, n + 1):
+        rank, digit = divmod(rank, base)
+        digits.append(digit)
+    remaining = list(range(n))
+    return tuple(remaining.pop(digit) for digit in reversed(digits))
+
+
+class RankedExplored:
+    """Explored set for a problem that maps its states to dense ranks in
+    [0, problem.state_count) with problem.rank(state): one bit per rank in a
+    bytearray, instead of a hashed state object per member of a set."""
+
+    def __init__(self, rank, size):
+        self.rank = rank
+        self.bits = bytearray((size + 7) // 8)
+        self.count = 0
+
+    def add(self, state):
+        rank = self.rank(state)
+        bit = 1 << (rank & 7)
+        if not self.bits[rank >> 3] & bit:
+            self.bits[rank >> 3] |= bit
+            self.count += 1
+
+    def __contains__(self, state):
+        rank = self.rank(state)
+        return bool(self.bits[rank >> 3] & (1 << (rank & 7)))
+
+    def __len__(self):
+        return self.count
+
+
+def explored_set(problem):
+    """Return an empty explored set for a graph search on problem: a set, or
+    a RankedExplored if the problem ranks its states and asks for one with
+    ranked_explored = True. The bit array holds a state in one bit instead
+    of a set entry, but ranking every state makes adding and lookups slower,
+    so it only pays off when memory is what runs out."""
+    if getattr(problem, 'ranked_explored', False):
+        return RankedExplored(problem.rank, problem.state_count)
+    return set()
+
+
 # ______________________________________________________________________________
 
 
@@ -177,10 +467,137 @@ class SimpleProblemSolvingAgentProgram:
         raise NotImplementedError
 
 
+# ______________________________________________________________________________
+# Search budgets
+
+
+class SearchBudget:
+    """Limits for one search: at most max_expansions calls of actions (or of
+    board_actions or predecessors), until seconds have passed or
+    time.monotonic() reaches deadline, and while the resident memory of the
+    process stays under max_memory bytes (a ValueError where that memory
+    cannot be read). Expansions are counted on every call; the clock and the
+    memory are only looked at every check_every expansions. Any searcher
+    below takes one as budget=, and then returns a BudgetExhausted instead
+    of running on when a limit is reached."""
+
+    def __init__(self, max_expansions=None, seconds=None, deadline=None, max_memory=None, check_every=256):
+        self.max_expansions = max_expansions
+        self.seconds = seconds
+        self.deadline = deadline
+        self.max_memory = max_memory
+        self.check_every = check_every
+
+
+class BudgetExhausted:
+    """The result of a search whose SearchBudget ran out: the limit reached
+    (reason is 'expansions', 'time' or 'memory'), the expansions done, the
+    seconds taken and the resident memory at the end (None where it cannot be
+    read). It is false, like the None of a failed search."""
+
+    def __init__(self, reason, expansions, seconds, memory):
+        self.reason = reason
+        self.expansions = expansions
+        self.seconds = seconds
+        self.memory = memory
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return '<BudgetExhausted {}: {} expansions, {:.3f} s, {} bytes>'.format(
+            self.reason, self.expansions, self.seconds, self.memory)
+
+
+class _OutOfBudget(Exception):
+    """Unwinds a searcher from BudgetedProblem.actions; the argument is the reason."""
+
+
+class BudgetedProblem(Problem):
+    """Delegates to a problem, and charges each call of actions (or of
+    board_actions or predecessors) to a SearchBudget, raising _OutOfBudget before the call
+    that goes over it. The other methods are the wrapped problem's own."""
+
+    def __init__(self, problem, budget):
+        self.problem = problem
+        self.budget = budget
+        self.expansions = 0
+        self.start = time.monotonic()
+        deadlines = [d for d in (budget.deadline, budget.seconds and self.start + budget.seconds) if d]
+        self.deadline = min(deadlines) if deadlines else None
+        self.limit = budget.max_expansions + 1 if budget.max_expansions is not None else float('inf')
+        self.next_check = min(budget.check_every, self.limit)
+        if budget.max_memory and _resident_memory() is None:
+            raise ValueError('max_memory is set, but the resident memory of this process cannot be read here')
+        self._actions, self.result, self.goal_test = problem.actions, problem.result, problem.goal_test
+        self.path_cost, self.value = problem.path_cost, problem.value
+        if hasattr(problem, 'h'):
+            self.h = problem.h
+        if hasattr(problem, 'board_actions'):
+            board_actions = problem.board_actions
+
+            def charged_board_actions(last_action=None):
+                self.expansions += 1
+                if self.expansions >= self.next_check:
+                    self.check()
+                return board_actions(last_action)
+
+            self.board_actions = charged_board_actions
+
+    def actions(self, state):
+        self.expansions += 1
+        if self.expansions >= self.next_check:
+            self.check()
+        return self._actions(state)
+
+    def predecessors(self, state):
+        self.expansions += 1
+        if self.expansions >= self.next_check:
+            self.check()
+        return self.problem.predecessors(state)
+
+    def check(self):
+        if self.expansions >= self.limit:
+            raise _OutOfBudget('expansions')
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise _OutOfBudget('time')
+        if self.budget.max_memory and _resident_memory() > self.budget.max_memory:
+            raise _OutOfBudget('memory')
+        self.next_check = min(self.expansions + self.budget.check_every, self.limit)
+
+    def exhausted(self, reason):
+        """The BudgetExhausted for reason; the charge that raised was not spent."""
+        return BudgetExhausted(reason, self.expansions - 1, time.monotonic() - self.start, _resident_memory())
+
+    def __getattr__(self, attr):
+        if attr == 'problem':  # not set yet, as while copying or unpickling
+            raise AttributeError(attr)
+        return getattr(self.problem, attr)
+
+
+def budgeted(searcher):
+    """Decorator letting searcher take a keyword budget=SearchBudget(...).
+    The search then runs on a BudgetedProblem, and returns a BudgetExhausted
+    if the budget runs out. Without a budget searcher runs as it is."""
+
+    @functools.wraps(searcher)
+    def budgeted_searcher(problem, *args, budget=None, **kwargs):
+        if budget is None:
+            return searcher(problem, *args, **kwargs)
+        problem = BudgetedProblem(problem, budget)
+        try:
+            return searcher(problem, *args, **kwargs)
+        except _OutOfBudget as out:
+            return problem.exhausted(out.args[0])
+
+    return budgeted_searcher
+
+
 # ______________________________________________________________________________
 # Uninformed Search algorithms
 
 
+@budgeted
 def breadth_first_tree_search(problem):
     """
     [Figure 3.7]
@@ -200,6 +617,7 @@ def breadth_first_tree_search(problem):
     return None
 
 
+@budgeted
 def depth_first_tree_search(problem):
     """
     [Figure 3.7]
@@ -219,6 +637,7 @@ def depth_first_tree_search(problem):
     return None
 
 
+@budgeted
 def depth_first_graph_search(problem):
     """
     [Figure 3.7]
@@ -228,16 +647,22 @@ def depth_first_graph_search(problem):
     Does not get trapped by loops.
     If two paths reach a state, only use the first one.
     """
-    frontier = [(Node(problem.initial))]  # Stack
+    frontier = LIFOFrontier([Node(problem.initial)])  # Stack
 
-    explored = set()
+    explored = explored_set(problem)
+    observe, on_prune = getattr(problem, 'observe', None), getattr(problem, 'on_prune', None)
     while frontier:
+        if observe:
+            observe(len(frontier), len(explored))
         node = frontier.pop()
         if problem.goal_test(node.state):
             return node
         explored.add(node.state)
-        frontier.extend(child for child in node.expand(problem)
-                        if child.state not in explored and child not in frontier)
+        for child in node.expand(problem):
+            if child.state not in explored and child not in frontier:
+                frontier.append(child)
+            elif on_prune:
+                on_prune(child)
     return None
 
 
@@ -246,6 +671,7 @@ def depth_first_graph_search(problem):
 
 
 
+@budgeted
 def random_search(problem, step_limits = -1):
 
     node = Node(problem.initial)
@@ -270,6 +696,7 @@ def random_search(problem, step_limits = -1):
 
 
 
+@budgeted
 def breadth_first_graph_search(problem, step_limits = -1):
     """[Figure 3.11]
     Note that this function can be implemented in a
@@ -279,12 +706,15 @@ def breadth_first_graph_search(problem, step_limits = -1):
     node = Node(problem.initial)
     if problem.goal_test(node.state):
         return node
-    frontier = deque([node])
-    explored = set()
+    frontier = FIFOFrontier([node])
+    explored = explored_set(problem)
+    observe, on_prune = getattr(problem, 'observe', None), getattr(problem, 'on_prune', None)
     step_num = 0
     while frontier:
+        if observe:
+            observe(len(frontier), len(explored))
         step_num = step_num + 1
-        node = frontier.popleft()
+        node = frontier.pop()
         if step_limits > 0 and step_num >= step_limits:  # its for debug
             return node
 
@@ -294,9 +724,62 @@ def breadth_first_graph_search(problem, step_limits = -1):
                 if problem.goal_test(child.state):
                     return child
                 frontier.append(child)
+            elif on_prune:
+                on_prune(child)
     return None
 
 
+@budgeted
+def ranked_breadth_first_search(problem):
+    """Breadth-first graph search that keeps one byte per state and no nodes,
+    for problems with rank, unrank, state_count and an inverse mapping from
+    each action to the action that takes it back (like EightPuzzle).
+    moves[rank] is 0 for states not reached yet, 255 for the initial state and
+    else a code (from 1) of the action that first reached the state; at most
+    254 distinct actions are supported. The frontier is the current layer
+    of ranks in an array. The path is rebuilt from the goal by undoing those
+    actions, and returned as a Node like the other searchers."""
+    rank, unrank = problem.rank, problem.unrank
+    start = rank(problem.initial)
+    moves = bytearray(problem.state_count)
+    moves[start] = 255
+    codes, actions = {}, [None]
+    found = start if problem.goal_test(problem.initial) else None
+    layer = array('l', [start])
+    while layer and found is None:
+        next_layer = array('l')
+        for r in layer:
+            state = unrank(r)
+            for action in problem.actions(state):
+                child = problem.result(state, action)
+                child_rank = rank(child)
+                if moves[child_rank]:
+                    continue
+                if action not in codes:
+                    codes[action] = len(actions)
+                    actions.append(action)
+                moves[child_rank] = codes[action]
+                if problem.goal_test(child):
+                    found = child_rank
+                    break
+                next_layer.append(child_rank)
+            if found is not None:
+                break
+        layer = next_layer
+    if found is None:
+        return None
+    path, state = [], unrank(found)
+    while moves[rank(state)] != 255:
+        action = actions[moves[rank(state)]]
+        path.append(action)
+        state = problem.result(state, problem.inverse[action])
+    node = Node(problem.initial)
+    for action in reversed(path):
+        node = node.child_node(problem, action)
+    return node
+
+
+@budgeted
 def best_first_graph_search(problem, f, display=False):
     """Search the nodes with the lowest f scores first.
     You specify the function f(node) that you want to minimize; for example,
@@ -304,13 +787,20 @@ def best_first_graph_search(problem, f, display=False):
     first search; if f is node.depth then we have breadth-first search.
     There is a subtlety: the line "f = memoize(f, 'f')" means that the f
     values will be cached on the nodes as they are computed. So after doing
-    a best first search you can examine the f values of the path returned."""
+    a best first search you can examine the f values of the path returned.
+    On unit-cost problems with small non-negative integer f values the
+    frontier is a BucketFrontier rather than a heap; see priority_frontier."""
+    if f == getattr(problem, 'h', None):
+        f = incremental_h(problem)
     f = memoize(f, 'f')
     node = Node(problem.initial)
-    frontier = PriorityQueue('min', f)
-    frontier.append(node)
-    explored = set()
+    frontier = priority_frontier(f, node, problem)
+    explored = explored_set(problem)
+    observe, on_prune, on_reopen = (getattr(problem, 'observe', None), getattr(problem, 'on_prune', None),
+                                    getattr(problem, 'on_reopen', None))
     while frontier:
+        if observe:
+            observe(len(frontier), len(explored))
         node = frontier.pop()
         if problem.goal_test(node.state):
             if display:
@@ -320,18 +810,23 @@ def best_first_graph_search(problem, f, display=False):
         for child in node.expand(problem):
             if child.state not in explored and child not in frontier:
                 frontier.append(child)
-            elif child in frontier:
-                if f(child) < frontier[child]:
-                    del frontier[child]
-                    frontier.append(child)
+            elif child in frontier and f(child) < frontier[child]:
+                del frontier[child]
+                frontier.append(child)
+                if on_reopen:
+                    on_reopen(child)
+            elif on_prune:
+                on_prune(child)
     return None
 
 
+@budgeted
 def uniform_cost_search(problem, display=False):
     """[Figure 3.14]"""
     return best_first_graph_search(problem, lambda node: node.path_cost, display)
 
 
+@budgeted
 def depth_limited_search(problem, limit=50):
     """[Figure 3.17]"""
 
@@ -354,6 +849,7 @@ def depth_limited_search(problem, limit=50):
     return recursive_dls(Node(problem.initial), problem, limit)
 
 
+@budgeted
 def iterative_deepening_search(problem):
     """[Figure 3.18]"""
     for depth in range(sys.maxsize):
@@ -366,80 +862,468 @@ def iterative_deepening_search(problem):
 # Bidirectional Search
 # Pseudocode from https://webdocs.cs.ualberta.ca/%7Eholte/Publications/MM-AAAI2016.pdf
 
-def bidirectional_search(problem):
+@budgeted
+def bidirectional_search(problem, h_backward=None):
+    """MM bidirectional heuristic search (Holte et al., 2016): a forward
+    search from problem.initial and a backward search from problem.goal,
+    each ordered by pr(n) = max(g(n) + h(n), 2 g(n)), meeting in the middle.
+    The backward search uses the problem's own actions, so they must be
+    reversible, and h_backward, an estimate of the cost from a node back to
+    problem.initial; by default the h of problem.reversed(), the problem
+    with initial and goal swapped (GraphProblem, EightPuzzle and NPuzzle
+    build one), or 0 for a problem without that method. Each direction keeps its
+    g values and nodes in dicts and lazy heaps keyed on pr, f and g, so the
+    minima are found without scanning the open list. Returns the goal node
+    of the cheapest path found, whose path_cost is the old return value U,
+    or None if there is no path."""
     e = 0
     if isinstance(problem, GraphProblem):
         e = problem.find_min_edge()
-    gF, gB = {Node(problem.initial): 0}, {Node(problem.goal): 0}
-    openF, openB = [Node(problem.initial)], [Node(problem.goal)]
-    closedF, closedB = [], []
-    U = np.inf
-
-    def extend(U, open_dir, open_other, g_dir, g_other, closed_dir):
-        """Extend search in given direction"""
-        n = find_key(C, open_dir, g_dir)
-
-        open_dir.remove(n)
-        closed_dir.append(n)
-
-        for c in n.expand(problem):
-            if c in open_dir or c in closed_dir:
-                if g_dir[c] <= problem.path_cost(g_dir[n], n.state, None, c.state):
-                    continue
-
-                open_dir.remove(c)
-
-            g_dir[c] = problem.path_cost(g_dir[n], n.state, None, c.state)
-            open_dir.append(c)
-
-            if c in open_other:
-                U = min(U, g_dir[c] + g_other[c])
+    if h_backward is None:
+        swapped = _swapped_problem(problem)
+        h_backward = swapped.h if swapped is not None else lambda node: 0
+
+    class Direction:
+        def __init__(self, problem, h, start):
+            self.problem, self.h = problem, h
+            self.g, self.nodes, self.closed = {}, {}, set()
+            self.pr_heap, self.f_heap, self.g_heap = [], [], []
+            self.push(Node(start), 0)
+
+        def push(self, node, g):
+            state = node.state
+            self.g[state], self.nodes[state] = g, node
+            self.closed.discard(state)
+            f = g + self.h(node)
+            heapq.heappush(self.pr_heap, (max(f, 2 * g), g, next(counter), state))
+            heapq.heappush(self.f_heap, (f, g, next(counter), state))
+            heapq.heappush(self.g_heap, (g, g, next(counter), state))
+
+        def top(self, heap):
+            """The smallest live entry of heap; entries are stale once their
+            state is closed or has been reached more cheaply."""
+            while heap and (heap[0][-1] in self.closed or heap[0][1] != self.g[heap[0][-1]]):
+                heapq.heappop(heap)
+            return heap[0] if heap else None
+
+        def __bool__(self):
+            return self.top(self.pr_heap) is not None
+
+    counter = itertools.count()
+    forward, back = Direction(problem, problem.h, problem.initial), Direction(problem, h_backward, problem.goal)
+    U, meet = np.inf, None
+
+    while forward and back:
+        pr_min_f, pr_min_b = forward.top(forward.pr_heap)[0], back.top(back.pr_heap)[0]
+        C = min(pr_min_f, pr_min_b)
+        if U <= max(C, forward.top(forward.f_heap)[0], back.top(back.f_heap)[0],
+                    forward.top(forward.g_heap)[0] + back.top(back.g_heap)[0] + e):
+            break
+        this, other = (forward, back) if C == pr_min_f else (back, forward)
+        # The open node with priority C and the smallest g
+        state = heapq.heappop(this.pr_heap)[-1]
+        this.closed.add(state)
+        node, g = this.nodes[state], this.g[state]
+        for child in node.expand(this.problem):
+            c = child.state
+            g_child = this.problem.path_cost(g, state, child.action, c)
+            if c in this.g and this.g[c] <= g_child:
+                continue
+            this.push(child, g_child)
+            if c in other.g:
+                if g_child + other.g[c] < U:
+                    U, meet = g_child + other.g[c], c
+
+    if meet is None:
+        return None
+    # The forward node reaching the meeting state already holds its path;
+    # extend it along the backward chain, finding the forward action of each step
+    node, back_node = forward.nodes[meet], back.nodes[meet].parent
+    while back_node is not None:
+        node = _step_to(problem, node, back_node.state)
+        back_node = back_node.parent
+    return node
+
+
+def _swapped_problem(problem):
+    """problem.reversed(), or None if problem has no reversed method; for an
+    InstrumentedProblem, HookedProblem or BudgetedProblem, of the problem it wraps."""
+    if isinstance(problem, (InstrumentedProblem, HookedProblem, BudgetedProblem)):
+        return _swapped_problem(problem.problem)
+    if not hasattr(problem, 'reversed'):
+        return None
+    return problem.reversed()
+
+
+def _step_to(problem, node, state):
+    """The cheapest child of node whose state is state."""
+    children = [node.child_node(problem, action) for action in problem.actions(node.state)
+                if problem.result(node.state, action) == state]
+    return min(children, key=lambda child: child.path_cost)
+
+
+@budgeted
+def bidirectional_breadth_first_search(problem):
+    """Breadth-first search from problem.initial and, through
+    problem.predecessors, backward from problem.goal (a state or a list of
+    goal states) at the same time. Each round expands a whole layer of the
+    direction whose frontier is smaller, and the search stops at the end of
+    the first layer that reaches a state seen from the other side, taking the
+    meeting state with the fewest steps in all. On unit-cost problems this
+    finds a shortest path while generating about the square root of the
+    states breadth_first_graph_search does. Returns the goal Node, or None."""
+    goals = problem.goal if isinstance(problem.goal, list) else [problem.goal]
+    # forward[s] = (previous state, action, depth); backward[s] = (next state, action, depth)
+    forward = {problem.initial: (None, None, 0)}
+    backward = {goal: (None, None, 0) for goal in goals}
+    meets = [problem.initial] if problem.initial in backward else []
+    layer_f, layer_b = [problem.initial], list(backward)
+    while layer_f and layer_b and not meets:
+        next_layer = []
+        if len(layer_f) <= len(layer_b):
+            for state in layer_f:
+                depth = forward[state][2] + 1
+                for action in problem.actions(state):
+                    child = problem.result(state, action)
+                    if child not in forward:
+                        forward[child] = (state, action, depth)
+                        next_layer.append(child)
+                        if child in backward:
+                            meets.append(child)
+            layer_f = next_layer
+        else:
+            for state in layer_b:
+                depth = backward[state][2] + 1
+                for action, previous in problem.predecessors(state):
+                    if previous not in backward:
+                        backward[previous] = (state, action, depth)
+                        next_layer.append(previous)
+                        if previous in forward:
+                            meets.append(previous)
+            layer_b = next_layer
+    if not meets:
+        return None
+    meet = min(meets, key=lambda state: forward[state][2] + backward[state][2])
+    actions, state = [], meet
+    while forward[state][0] is not None:
+        state, action, _ = forward[state]
+        actions.append(action)
+    actions.reverse()
+    state = meet
+    while backward[state][0] is not None:
+        state, action, _ = backward[state]
+        actions.append(action)
+    node = Node(problem.initial)
+    for action in actions:
+        node = node.child_node(problem, action)
+    return node
 
-        return U, open_dir, closed_dir, g_dir
 
-    def find_min(open_dir, g):
-        """Finds minimum priority, g and f values in open_dir"""
-        # pr_min_f isn't forward pr_min instead it's the f-value
-        # of node with priority pr_min.
-        pr_min, pr_min_f = np.inf, np.inf
-        for n in open_dir:
-            f = g[n] + problem.h(n)
-            pr = max(f, 2 * g[n])
-            pr_min = min(pr_min, pr)
-            pr_min_f = min(pr_min_f, f)
+# ______________________________________________________________________________
+# Parallel search
+#
+# These searchers spread the work over worker processes. Every worker owns
+# the states that state_owner assigns to it and keeps their bookkeeping, so
+# duplicates are detected in the process that holds the state. Problems and
+# states must be picklable.
+
+
+def state_owner(state, processes):
+    """The index of the worker that owns state. It hashes repr(state), which
+    unlike hash() gives the same result in every process."""
+    return zlib.crc32(repr(state).encode()) % processes
+
+
+def _start_workers(target, processes, *args):
+    """Start processes workers running target(index, processes, conn, *args);
+    return them and the coordinator's ends of their pipes."""
+    workers, conns = [], []
+    for index in range(processes):
+        here, there = multiprocessing.Pipe()
+        worker = multiprocessing.Process(target=target, args=(index, processes, there) + args, daemon=True)
+        worker.start()
+        workers.append(worker)
+        conns.append(here)
+    return workers, conns
+
+
+def _stop_workers(workers, conns):
+    for conn in conns:
+        try:
+            conn.send(('stop',))
+        except OSError:
+            pass
+    for worker in workers:
+        worker.join(1)
+        if worker.is_alive():
+            worker.terminate()
+            worker.join()
+
+
+def _actions_to(state, conns):
+    """The actions from the initial state to state, asking the owner of each
+    state on the way for its ('parent', state) entry."""
+    actions = []
+    while True:
+        conn = conns[state_owner(state, len(conns))]
+        conn.send(('parent', state))
+        state, action = conn.recv()
+        if state is None:
+            return actions[::-1]
+        actions.append(action)
+
+
+def parallel_breadth_first_search(problem, processes=None, depth_limit=None):
+    """Breadth-first graph search, one layer at a time, over several worker
+    processes (os.cpu_count() by default). Each worker expands the states of
+    the layer it owns and sends every child, in one pickled batch per
+    destination relayed by this process, to the child's owner, which keeps
+    the child if it is new. Children carry the key parent key * branching +
+    action index, which orders each layer the way the FIFO queue of
+    breadth_first_graph_search does; an owner keeps the smallest key it is
+    offered, and the goal with the smallest key wins, so the path found is
+    the same as the serial searcher's. With depth_limit, give up (return
+    None) after that many layers."""
+    node = Node(problem.initial)
+    if problem.goal_test(node.state):
+        return node
+    processes = processes or os.cpu_count() or 1
+    workers, conns = _start_workers(_bfs_worker, processes, problem)
+    try:
+        branching, depth, goal = len(problem.actions(problem.initial)), 0, None
+        while branching and goal is None and (depth_limit is None or depth < depth_limit):
+            for conn in conns:
+                conn.send(('expand', branching))
+            outboxes = [conn.recv() for conn in conns]
+            for index, conn in enumerate(conns):
+                conn.send(('insert', [outbox[index] for outbox in outboxes]))
+            reports = [conn.recv() for conn in conns]
+            depth += 1
+            branching = max(report[0] for report in reports)
+            goals = [report[1] for report in reports if report[1] is not None]
+            if goals:
+                goal = min(goals)[1]
+        if goal is None:
+            return None
+        actions = _actions_to(goal, conns)
+    finally:
+        _stop_workers(workers, conns)
+    for action in actions:
+        node = node.child_node(problem, action)
+    return node
+
+
+def _bfs_worker(index, processes, conn, problem):
+    """Worker process of parallel_breadth_first_search. Messages:
+    ('expand', branching) -> one pickled batch of (child, parent, action, key)
+    records per worker; ('insert', batches) -> (largest number of actions in
+    the new layer, smallest (key, goal state) in it or None);
+    ('parent', state) -> (parent state, action); ('stop',)."""
+    parents = {}  # (parent state, action) for every state owned, (None, None) for the initial one
+    layer, keys = [], {}
+    if state_owner(problem.initial, processes) == index:
+        parents[problem.initial] = (None, None)
+        layer.append((problem.initial, 0, problem.actions(problem.initial)))
+
+    def offer(child, parent, action, key):
+        if child in keys:
+            if key < keys[child]:
+                keys[child] = key
+                parents[child] = (parent, action)
+        elif child not in parents:
+            keys[child] = key
+            parents[child] = (parent, action)
 
-        return pr_min, pr_min_f, min(g.values())
+    while True:
+        message = conn.recv()
+        if message[0] == 'expand':
+            branching = message[1]
+            batches = [[] for _ in range(processes)]
+            for state, key, actions in layer:
+                key *= branching
+                for i, action in enumerate(actions):
+                    child = problem.result(state, action)
+                    batches[state_owner(child, processes)].append((child, state, action, key + i))
+            for record in batches[index]:
+                offer(*record)
+            batches[index] = []
+            conn.send([pickle.dumps(batch, pickle.HIGHEST_PROTOCOL) if batch else b'' for batch in batches])
+        elif message[0] == 'insert':
+            for data in message[1]:
+                if data:
+                    for record in pickle.loads(data):
+                        offer(*record)
+            layer = [(state, key, problem.actions(state)) for state, key in keys.items()]
+            goals = [(key, state) for state, key in keys.items() if problem.goal_test(state)]
+            keys = {}
+            conn.send((max((len(actions) for _, _, actions in layer), default=0),
+                       min(goals, key=lambda goal: goal[0]) if goals else None))
+        elif message[0] == 'parent':
+            conn.send(parents[message[1]])
+        else:
+            break
 
-    def find_key(pr_min, open_dir, g):
-        """Finds key in open_dir with value equal to pr_min
-        and minimum g value."""
-        m = np.inf
-        node = Node(-1)
-        for n in open_dir:
-            pr = max(g[n] + problem.h(n), 2 * g[n])
-            if pr == pr_min:
-                if g[n] < m:
-                    m = g[n]
-                    node = n
 
+def hash_distributed_astar_search(problem, h=None, processes=None, batch=64):
+    """HDA*: A* search over several worker processes (os.cpu_count() by
+    default), each owning the states that state_owner assigns to it with its
+    own open and closed lists. The search runs in synchronous rounds: every
+    worker expands up to batch of its best open nodes with f below the cost
+    U of the best solution found so far, and the children go in one pickled
+    batch per destination, relayed by this process, to their owners, which
+    keep them if they are new or reached more cheaply. A goal found by an
+    owner lowers U. At the end of a round no batch is in flight, so the
+    search is over as soon as no worker has an open node with f < U; with an
+    admissible h (default problem.h), the path of cost U is then optimal.
+    h must be picklable, as must problem and its states."""
+    node = Node(problem.initial)
+    if problem.goal_test(node.state):
         return node
+    processes = processes or os.cpu_count() or 1
+    workers, conns = _start_workers(_hda_worker, processes, problem, h)
+    try:
+        U, goal = np.inf, None
+        while True:
+            for conn in conns:
+                conn.send(('expand', U, batch))
+            outboxes = [conn.recv() for conn in conns]
+            for index, conn in enumerate(conns):
+                conn.send(('insert', [outbox[index] for outbox in outboxes]))
+            reports = [conn.recv() for conn in conns]
+            for _, best in reports:
+                if best is not None and best[0] < U:
+                    U, goal = best
+            if min(f for f, _ in reports) >= U:
+                break
+        if goal is None:
+            return None
+        actions = _actions_to(goal, conns)
+    finally:
+        _stop_workers(workers, conns)
+    for action in actions:
+        node = node.child_node(problem, action)
+    return node
+
+
+def _hda_worker(index, processes, conn, problem, h):
+    """Worker process of hash_distributed_astar_search. Messages:
+    ('expand', U, batch) -> one pickled batch of (child, parent, action, g)
+    records per worker; ('insert', batches) -> (smallest f on the open list,
+    cheapest (g, goal state) found or None); ('parent', state) ->
+    (parent state, action); ('stop',)."""
+    h = h or problem.h
+    g, parents, closed, open_heap = {}, {}, set(), []
+    counter = itertools.count()
+    best = None
+
+    def offer(child, parent, action, cost):
+        nonlocal best
+        if child in g and g[child] <= cost:
+            return
+        g[child] = cost
+        parents[child] = (parent, action)
+        closed.discard(child)
+        heapq.heappush(open_heap, (cost + h(Node(child, None, action, cost)), -cost, next(counter), child))
+        if problem.goal_test(child) and (best is None or cost < best[0]):
+            best = (cost, child)
+
+    def f_min():
+        # Drop entries for closed states and for states reached more cheaply since
+        while open_heap and (open_heap[0][3] in closed or -open_heap[0][1] != g[open_heap[0][3]]):
+            heapq.heappop(open_heap)
+        return open_heap[0][0] if open_heap else np.inf
+
+    if state_owner(problem.initial, processes) == index:
+        offer(problem.initial, None, None, 0)
 
-    while openF and openB:
-        pr_min_f, f_min_f, g_min_f = find_min(openF, gF)
-        pr_min_b, f_min_b, g_min_b = find_min(openB, gB)
-        C = min(pr_min_f, pr_min_b)
-
-        if U <= max(C, f_min_f, f_min_b, g_min_f + g_min_b + e):
-            return U
-
-        if C == pr_min_f:
-            # Extend forward
-            U, openF, closedF, gF = extend(U, openF, openB, gF, gB, closedF)
+    while True:
+        message = conn.recv()
+        if message[0] == 'expand':
+            _, U, batch = message
+            batches = [[] for _ in range(processes)]
+            for _ in range(batch):
+                if f_min() >= U:
+                    break
+                state = heapq.heappop(open_heap)[3]
+                closed.add(state)
+                for action in problem.actions(state):
+                    child = problem.result(state, action)
+                    batches[state_owner(child, processes)].append(
+                        (child, state, action, problem.path_cost(g[state], state, action, child)))
+            for record in batches[index]:
+                offer(*record)
+            batches[index] = []
+            conn.send([pickle.dumps(batch, pickle.HIGHEST_PROTOCOL) if batch else b'' for batch in batches])
+        elif message[0] == 'insert':
+            for data in message[1]:
+                if data:
+                    for record in pickle.loads(data):
+                        offer(*record)
+            conn.send((f_min(), best))
+        elif message[0] == 'parent':
+            conn.send(parents[message[1]])
         else:
-            # Extend backward
-            U, openB, closedB, gB = extend(U, openB, openF, gB, gF, closedB)
+            break
+
 
-    return np.inf
+def portfolio_search(problem, searchers=None, optimal=False, timeout=None):
+    """Race several searchers on problem, each in its own process, and keep
+    the first answer. The default portfolio is breadth-first, greedy, A*,
+    IDA* and RBFS. With optimal=True only the searchers in
+    OPTIMAL_SEARCHERS (those that return an optimal path when h is
+    admissible) are started. As soon as one returns a solution, or after
+    timeout seconds, the other processes are terminated and reaped.
+    Returns (goal node or None, name of the winning searcher or None,
+    wall-clock seconds). A worker sends back its solution as a list of
+    actions, from which the node is rebuilt here, rather than pickling the
+    whole chain of nodes."""
+    if searchers is None:
+        searchers = [breadth_first_graph_search, greedy_search, astar_search,
+                     iterative_deepening_astar_search, recursive_best_first_search]
+    if optimal:
+        searchers = [searcher for searcher in searchers if searcher in OPTIMAL_SEARCHERS]
+    start = time.perf_counter()
+    running = {}
+    for searcher in searchers:
+        here, there = multiprocessing.Pipe(duplex=False)
+        worker = multiprocessing.Process(target=_portfolio_worker, args=(searcher, problem, there), daemon=True)
+        worker.start()
+        there.close()
+        running[here] = (name(searcher), worker)
+    winner, actions = None, None
+    try:
+        while running and winner is None:
+            remaining = None if timeout is None else timeout - (time.perf_counter() - start)
+            if remaining is not None and remaining <= 0:
+                break
+            for conn in multiprocessing.connection.wait(list(running), remaining):
+                searcher_name, worker = running.pop(conn)
+                try:
+                    actions = conn.recv()
+                except EOFError:  # the searcher raised an exception or was killed
+                    actions = None
+                worker.join()
+                if actions is not None:
+                    winner = searcher_name
+                    break
+    finally:
+        for searcher_name, worker in running.values():
+            worker.terminate()
+        for searcher_name, worker in running.values():
+            worker.join()
+    node = None
+    if winner is not None:
+        node = Node(problem.initial)
+        for action in actions:
+            node = node.child_node(problem, action)
+    return node, winner, time.perf_counter() - start
+
+
+def _portfolio_worker(searcher, problem, conn):
+    """Worker process of portfolio_search: run searcher and send back the
+    actions of its solution, or None."""
+    node = searcher(problem)
+    conn.send(node.solution() if isinstance(node, Node) else None)
 
 
 # ______________________________________________________________________________
@@ -452,14 +1336,263 @@ greedy_best_first_graph_search = best_first_graph_search
 # Greedy best-first search is accomplished by specifying f(n) = h(n).
 
 
+@budgeted
+def greedy_search(problem, h=None):
+    """Greedy best-first graph search, with f(n) = h(n) (default problem.h)."""
+    return best_first_graph_search(problem, h or problem.h)
+
+
+@budgeted
 def astar_search(problem, h=None, display=False):
     """A* search is best-first graph search with f(n) = g(n)+h(n).
     You need to specify the h function when you call astar_search, or
     else in your Problem subclass."""
-    h = memoize(h or problem.h, 'h')
+    h = incremental_h(problem, h)
     return best_first_graph_search(problem, lambda n: n.path_cost + h(n), display)
 
 
+def incremental_h(problem, h=None):
+    """Return h (default problem.h) memoized in the 'h' slot of each node.
+    If h is the problem's own h and the problem also has an
+    h_delta(state, action, child) method, a child's h is computed as its
+    parent's h plus that delta instead of from scratch."""
+    h = h or problem.h
+    h_delta = getattr(problem, 'h_delta', None)
+    if h_delta is None or h != problem.h:
+        return memoize(h, 'h')
+
+    def h_incremental(node):
+        try:
+            return node.h
+        except AttributeError:
+            parent = node.parent
+            if parent is not None and hasattr(parent, 'h'):
+                node.h = parent.h + h_delta(parent.state, node.action, node.state)
+            else:
+                node.h = h(node)
+            return node.h
+
+    return h_incremental
+
+
+def anytime_weighted_astar_search(problem, h=None, weight=2, budget=None):
+    """Anytime weighted A*: best-first graph search with f(n) = g(n)+weight*h(n)
+    that goes on after the first goal. Nodes that cannot beat the incumbent
+    solution (g(n)+h(n) >= its cost) are pruned, and a state reached again by
+    a cheaper path is reopened. This is a generator: it yields (node, bound)
+    for every better goal node found, where bound is the incumbent's cost
+    over the lowest g(n)+h(n) left on the frontier, so the solution costs at
+    most bound times the optimum if h is admissible. When the frontier runs
+    out the last solution is optimal, and it is yielded again with bound 1
+    unless it already had it. Iteration also ends when budget (a
+    SearchBudget) runs out, so the last solution yielded is the best found
+    in time."""
+    if budget is not None:
+        problem = BudgetedProblem(problem, budget)
+    h = incremental_h(problem, h)
+    f = memoize(lambda n: n.path_cost + weight * h(n), 'f')
+    node = Node(problem.initial)
+    frontier = priority_frontier(f, node, problem)
+    best_g = {node.state: 0}
+    incumbent, bound = None, None
+    observe, on_prune, on_reopen = (getattr(problem, 'observe', None), getattr(problem, 'on_prune', None),
+                                    getattr(problem, 'on_reopen', None))
+    try:
+        while frontier:
+            if observe:
+                observe(len(frontier), len(best_g))
+            node = frontier.pop()
+            if incumbent is not None and node.path_cost + h(node) >= incumbent.path_cost:
+                if on_prune:
+                    on_prune(node)
+                continue
+            if problem.goal_test(node.state):
+                incumbent = node
+                lower = min((n.path_cost + h(n) for n in frontier.index.values()), default=np.inf)
+                bound = node.path_cost / lower if 0 < lower < node.path_cost else 1
+                yield node, bound
+                continue
+            for child in node.expand(problem):
+                g = child.path_cost
+                if ((incumbent is not None and g + h(child) >= incumbent.path_cost)
+                        or g >= best_g.get(child.state, np.inf)):
+                    if on_prune:
+                        on_prune(child)
+                    continue
+                if on_reopen and child.state in best_g:
+                    on_reopen(child)
+                best_g[child.state] = g
+                if child in frontier:
+                    del frontier[child]
+                frontier.append(child)
+    except _OutOfBudget:
+        return
+    if incumbent is not None and bound != 1:
+        yield incumbent, 1
+
+
+@budgeted
+def focal_search(problem, epsilon=0.5, h=None, h_focal=None):
+    """A*-epsilon focal search: of the frontier nodes with f(n) = g(n)+h(n) at
+    most (1+epsilon) times the lowest f on the frontier (the focal list), the
+    one with the lowest h_focal(n) is expanded, where h_focal estimates the
+    search effort left, such as the number of steps to go; by default it is
+    h itself. If h is admissible the solution costs at most (1+epsilon)
+    times the optimum, and with a focal heuristic that leads straight to a
+    goal far fewer nodes are expanded than by astar_search.
+
+    Three heaps share the frontier nodes: open by f, to know the lowest f;
+    focal by (h_focal, f); and pending by f, for nodes whose f was above
+    the focal bound when they were generated. As the lowest f rises, pending
+    nodes move to focal. Entries for nodes replaced by a cheaper path are
+    dropped lazily. States reached again by a cheaper path are reopened,
+    which the bound needs."""
+    h = incremental_h(problem, h)
+    h_focal = h_focal or h
+    node = Node(problem.initial)
+    best_g = {node.state: 0}
+    live = {node.state: node}  # the frontier node of each state
+    f = node.path_cost + h(node)
+    open_heap, focal, pending = [(f, node)], [(h_focal(node), f, node)], []
+    observe, on_prune, on_reopen = (getattr(problem, 'observe', None), getattr(problem, 'on_prune', None),
+                                    getattr(problem, 'on_reopen', None))
+    while live:
+        if observe:
+            observe(len(live), len(best_g))
+        while live.get(open_heap[0][1].state) is not open_heap[0][1]:
+            heapq.heappop(open_heap)
+        bound = (1 + epsilon) * open_heap[0][0]
+        while pending and pending[0][0] <= bound:
+            f, node = heapq.heappop(pending)
+            if live.get(node.state) is node:
+                heapq.heappush(focal, (h_focal(node), f, node))
+        while True:
+            _, f, node = heapq.heappop(focal)
+            if live.get(node.state) is not node:
+                continue
+            if f > bound:  # the lowest f fell since node was put in focal
+                heapq.heappush(pending, (f, node))
+                continue
+            break
+        del live[node.state]
+        if problem.goal_test(node.state):
+            return node
+        for child in node.expand(problem):
+            g = child.path_cost
+            if g >= best_g.get(child.state, np.inf):
+                if on_prune:
+                    on_prune(child)
+                continue
+            if on_reopen and child.state in best_g:
+                on_reopen(child)
+            best_g[child.state] = g
+            live[child.state] = child
+            f = g + h(child)
+            heapq.heappush(open_heap, (f, child))
+            if f <= bound:
+                heapq.heappush(focal, (h_focal(child), f, child))
+            else:
+                heapq.heappush(pending, (f, child))
+    return None
+
+
+@budgeted
+def beam_search(problem, width=100, h=None):
+    """Breadth-first beam search: of the children of each layer only the
+    width with the lowest f(n) = g(n)+h(n) are kept, the cheapest node for
+    each state, leaving out states already in an earlier layer. So at most
+    width nodes are kept per layer, and memory is bounded by width times the
+    depth. Returns the cheapest goal node of the first layer holding one, or
+    None when the beam runs empty; it may miss solutions or return a costlier
+    one. beam_stack_search backtracks instead."""
+    h = incremental_h(problem, h)
+    f = memoize(lambda n: n.path_cost + h(n), 'f')
+    node = Node(problem.initial)
+    if problem.goal_test(node.state):
+        return node
+    beam, seen = [node], {node.state}
+    observe = getattr(problem, 'observe', None)
+    while beam:
+        if observe:
+            observe(len(beam), len(seen))
+        children = {}
+        for node in beam:
+            for child in node.expand(problem):
+                if child.state not in seen and (child.state not in children or
+                                                child.path_cost < children[child.state].path_cost):
+                    children[child.state] = child
+        beam = heapq.nsmallest(width, children.values(), key=f)
+        goals = [child for child in beam if problem.goal_test(child.state)]
+        if goals:
+            return min(goals, key=lambda goal: goal.path_cost)
+        seen.update(child.state for child in beam)
+    return None
+
+
+@budgeted
+def beam_stack_search(problem, width=100, h=None, upper=np.inf):
+    """Beam-stack search (Zhou and Hansen): beam search that backtracks, so it
+    is complete, and with an admissible h returns an optimal solution.
+
+    The layers of the current beam are kept, each a dict from state to node,
+    with a beam stack holding for each layer the range [fmin, fmax) of f
+    values of the children let into the next layer. When more than width
+    children fall in the range, the costlier ones are pruned and fmax drops
+    to the lowest f pruned. Every goal found cheaper than upper becomes the
+    incumbent and lowers upper, and nodes with f >= upper are dropped. When
+    a layer comes out empty the search backtracks to the deepest layer that
+    pruned children and goes on with the range [fmax, upper) there. Memory
+    stays bounded by width times the depth. Returns the best goal node, or
+    None if there is none cheaper than upper."""
+    h = incremental_h(problem, h)
+    f = memoize(lambda n: n.path_cost + h(n), 'f')
+    node = Node(problem.initial)
+    if problem.goal_test(node.state):
+        return node
+    layers, stack = [{node.state: node}], [[0, np.inf]]
+    best = None
+    observe = getattr(problem, 'observe', None)
+    while stack:
+        if observe:
+            observe(len(layers[-1]), sum(map(len, layers)))
+        fmin, fmax = stack[-1]
+        children = {}
+        for node in layers[-1].values():
+            for child in node.expand(problem):
+                value = f(child)
+                if not fmin <= value < min(fmax, upper):
+                    continue
+                if any(child.state in layer and layer[child.state].path_cost <= child.path_cost for layer in layers):
+                    continue
+                if child.state not in children or child.path_cost < children[child.state].path_cost:
+                    children[child.state] = child
+        kept = sorted(children.values(), key=f)
+        if len(kept) > width:
+            cut = f(kept[width])
+            if f(kept[0]) == cut:  # ties at the boundary: let them all in
+                cut = next((f(child) for child in kept if f(child) > cut), np.inf)
+            kept = [child for child in kept if f(child) < cut]
+            stack[-1][1] = cut
+        layer = {}
+        for child in kept:
+            if problem.goal_test(child.state):
+                if child.path_cost < upper:
+                    best, upper = child, child.path_cost
+            elif f(child) < upper:
+                layer[child.state] = child
+        if layer:
+            layers.append(layer)
+            stack.append([0, np.inf])
+            continue
+        # Backtrack to the deepest layer with pruned children left below upper
+        while stack and stack[-1][1] >= upper:
+            stack.pop()
+            layers.pop()
+        if stack:
+            stack[-1][:] = stack[-1][1], np.inf
+    return best
+
+
 # ______________________________________________________________________________
 # A* heuristics
 
@@ -526,50 +1659,115 @@ class Knuth_conject_4(Problem):
 
 
 
+def sliding_tile_moves(width):
+    """For each blank square of a width x width sliding-tile board, return
+    the legal actions (in the order UP, DOWN, LEFT, RIGHT) and a dict from
+    each of them to the square the blank moves to."""
+    actions, neighbors = [], []
+    for blank in range(width * width):
+        row, col = divmod(blank, width)
+        moves = {}
+        if row > 0:
+            moves['UP'] = blank - width
+        if row < width - 1:
+            moves['DOWN'] = blank + width
+        if col > 0:
+            moves['LEFT'] = blank - 1
+        if col < width - 1:
+            moves['RIGHT'] = blank + 1
+        actions.append(tuple(moves))
+        neighbors.append(moves)
+    return actions, neighbors
+
+
 class EightPuzzle(Problem):
     """ The problem of sliding tiles numbered from 1 to 8 on a 3x3 board, where one of the
     squares is a blank. A state is represented as a tuple of length 9, where  element at
     index i represents the tile number  at index i (0 if it's an empty square) """
 
-    def __init__(self, initial, goal=(1, 2, 3, 4, 5, 6, 7, 8, 0)):
-        """ Define goal state and initialize a problem """
+    inverse = {'UP': 'DOWN', 'DOWN': 'UP', 'LEFT': 'RIGHT', 'RIGHT': 'LEFT'}
+    # Per blank square: the legal actions, and the square each one moves the blank to
+    actions_table, neighbors = sliding_tile_moves(3)
+    # goal -> its line_tables, shared by the puzzles with that goal
+    line_tables_cache = {}
+
+    def __init__(self, initial, goal=(1, 2, 3, 4, 5, 6, 7, 8, 0), heuristic='misplaced', ranked_explored=False):
+        """ Define goal state and initialize a problem. heuristic picks h:
+        'misplaced' (tiles, the default), 'manhattan' or 'linear_conflict'.
+        With ranked_explored the graph searchers keep their explored set as
+        a bit array over the state ranks (see explored_set) """
         super().__init__(initial, goal)
+        self.heuristic = heuristic
+        self.ranked_explored = ranked_explored
+        if heuristic != 'misplaced':
+            self.h = getattr(self, heuristic)
+        self.tile_delta = getattr(self, heuristic + '_delta')
+        self.goal_row = [0] * 9
+        self.goal_col = [0] * 9
+        for square, tile in enumerate(goal):
+            self.goal_row[tile], self.goal_col[tile] = divmod(square, 3)
+        # distance[tile][square]: Manhattan distance from square to the tile's goal (0 for the blank)
+        self.distance = [[(abs(square // 3 - self.goal_row[tile]) + abs(square % 3 - self.goal_col[tile])) * (tile != 0)
+                          for square in range(9)] for tile in range(9)]
+        # line_tables[square, row]: the squares of the row (or, if row is False,
+        # the column) through square, and a table from the tiles on those
+        # squares to their line_conflicts; only the linear-conflict heuristic
+        # reads them, and they are built once per goal
+        if heuristic == 'linear_conflict':
+            key = tuple(goal)
+            if key not in self.line_tables_cache:
+                self.line_tables_cache[key] = self.build_line_tables()
+            self.line_tables = self.line_tables_cache[key]
+        # board_moves[blank][last action] -> actions for the in-place board,
+        # without the move that would undo the last one
+        self.board_moves = []
+        for actions in self.actions_table:
+            self.board_moves.append({last: [a for a in actions if a != self.inverse.get(last)]
+                                     for last in (None,) + actions + tuple(self.inverse[a] for a in actions)})
+        self.board = None
+
+    def reversed(self):
+        """ The same puzzle from goal back to initial, with its tables built for that goal """
+
+        return type(self)(self.goal, self.initial, self.heuristic, self.ranked_explored)
 
     def find_blank_square(self, state):
         """Return the index of the blank square in a given state"""
 
         return state.index(0)
 
-    def actions(self, state):
-        """ Return the actions that can be executed in the given state.
-        The result would be a list, since there are only four possible actions
-        in any given state of the environment """
+    # Ranking: a state is one of the 9! permutations of the tiles, so the graph
+    # searchers can keep their explored set as a bit array (see explored_set),
+    # and ranked_breadth_first_search can keep one byte per state
 
-        possible_actions = ['UP', 'DOWN', 'LEFT', 'RIGHT']
-        index_blank_square = self.find_blank_square(state)
+    state_count = 362880
 
-        if index_blank_square % 3 == 0:
-            possible_actions.remove('LEFT')
-        if index_blank_square < 3:
-            possible_actions.remove('UP')
-        if index_blank_square % 3 == 2:
-            possible_actions.remove('RIGHT')
-        if index_blank_square > 5:
-            possible_actions.remove('DOWN')
+    def rank(self, state):
+        """ Return the index of state in [0, 9!) """
 
-        return possible_actions
+        return rank_permutation(state)
+
+    def unrank(self, rank):
+        """ Return the state with the given index """
+
+        return unrank_permutation(rank, 9)
+
+    def actions(self, state):
+        """ Return the actions that can be executed in the given state.
+        There are at most four, looked up in a table precomputed for each
+        square of the blank; the tuple returned is shared, do not modify it """
+
+        return self.actions_table[state.index(0)]
 
     def result(self, state, action):
         """ Given state and action, return a new state that is the result of the action.
         Action is assumed to be a valid action in the state """
 
         # blank is the index of the blank square
-        blank = self.find_blank_square(state)
+        blank = state.index(0)
+        neighbor = self.neighbors[blank][action]
         new_state = list(state)
-
-        delta = {'UP': -3, 'DOWN': 3, 'LEFT': -1, 'RIGHT': 1}
-        neighbor = blank + delta[action]
-        new_state[blank], new_state[neighbor] = new_state[neighbor], new_state[blank]
+        new_state[blank], new_state[neighbor] = new_state[neighbor], 0
 
         return tuple(new_state)
 
@@ -577,7 +1775,12 @@ class EightPuzzle(Problem):
         """ Given a state, return True if state is a goal state or False, otherwise """
 
         return state == self.goal
-    '''
+
+    def predecessors(self, state):
+        """ Return (action, previous state) pairs; every move is undone by its inverse """
+
+        return [(self.inverse[action], self.result(state, action)) for action in self.actions(state)]
+
     def check_solvability(self, state):
         """ Checks if the given state is solvable """
 
@@ -588,13 +1791,523 @@ class EightPuzzle(Problem):
                     inversion += 1
 
         return inversion % 2 == 0
-    '''
+
     def h(self, node):
         """ Return the heuristic value for a given state. Default heuristic function used is
         h(n) = number of misplaced tiles """
 
         return sum(s != g for (s, g) in zip(node.state, self.goal))
 
+    def manhattan(self, node):
+        """ Sum of the Manhattan distances of the tiles to their goal squares """
+
+        distance = self.distance
+        return sum(distance[tile][square] for (square, tile) in enumerate(node.state))
+
+    def linear_conflict(self, node):
+        """ Manhattan distance plus 2 moves for every tile that must leave its goal
+        row or column to let the other tiles of that line pass it """
+
+        tiles, conflicts = node.state, 0
+        for square, row in ((0, True), (3, True), (6, True), (0, False), (1, False), (2, False)):
+            (a, b, c), table = self.line_tables[square, row]
+            conflicts += table[tiles[a], tiles[b], tiles[c]]
+        return self.manhattan(node) + 2 * conflicts
+
+    def build_line_tables(self):
+        """ Return the line_tables for this puzzle's goal """
+
+        line_tables = {}
+        for line in range(3):
+            for row, squares in ((True, (3 * line, 3 * line + 1, 3 * line + 2)), (False, (line, line + 3, line + 6))):
+                table = {tiles: self.line_conflicts(tiles, line, row)
+                         for tiles in itertools.product(range(9), repeat=3)}
+                for square in squares:
+                    line_tables[square, row] = squares, table
+        return line_tables
+
+    def line_conflicts(self, line_tiles, line, row=True):
+        """ Given the tiles of a row (or column) in order, return how many of them
+        must leave it so that the rest of those whose goal is in it are in goal order """
+
+        if row:
+            targets = [self.goal_col[t] for t in line_tiles if t and self.goal_row[t] == line]
+        else:
+            targets = [self.goal_row[t] for t in line_tiles if t and self.goal_col[t] == line]
+        if len(targets) < 2:
+            return 0
+        # Tiles that may stay: the longest increasing subsequence of targets
+        longest = [1] * len(targets)
+        for i in range(len(targets)):
+            for j in range(i):
+                if targets[j] < targets[i] and longest[j] >= longest[i]:
+                    longest[i] = longest[j] + 1
+        return len(targets) - max(longest)
+
+    # Incremental heuristics: tile_delta(tiles, src, dst) is the change of h when
+    # the tile on square src of tiles slides into the blank on square dst.
+
+    def h_delta(self, state, action, child):
+        """ Return h(child) - h(state), where child = result(state, action) """
+
+        blank = state.index(0)
+        return self.tile_delta(state, self.neighbors[blank][action], blank)
+
+    def misplaced_delta(self, tiles, src, dst):
+        tile, goal = tiles[src], self.goal
+        return (tile != goal[dst]) - (tile != goal[src]) + (goal[src] != 0) - (goal[dst] != 0)
+
+    def manhattan_delta(self, tiles, src, dst):
+        distance = self.distance[tiles[src]]
+        return distance[dst] - distance[src]
+
+    def linear_conflict_delta(self, tiles, src, dst):
+        tile = tiles[src]
+        # Moving up or down changes the tile's row, moving sideways its column;
+        # the order of the line it moves along stays the same
+        row = src // 3 != dst // 3
+        change = self.manhattan_delta(tiles, src, dst)
+        for square, new in ((src, 0), (dst, tile)):
+            squares, table = self.line_tables[square, row]
+            a, b, c = squares
+            before = (tiles[a], tiles[b], tiles[c])
+            i = squares.index(square)
+            change += 2 * (table[before[:i] + (new,) + before[i + 1:]] - table[before])
+        return change
+
+    # In-place board protocol, used by iterative_deepening_astar_search.
+    # The problem holds one mutable board; apply and undo slide the blank
+    # without allocating new states, and h is updated through tile_delta.
+
+    def load(self, state):
+        """ Make state the current board """
+
+        self.board = list(state)
+        self.blank = self.board.index(0)
+        self.board_value = self.h(Node(tuple(state)))
+
+    def board_actions(self, last_action=None):
+        """ Return the actions for the current board, except the one that
+        would undo last_action """
+
+        return self.board_moves[self.blank][last_action]
+
+    def apply(self, action):
+        """ Slide the blank of the current board in the given direction """
+
+        board, blank = self.board, self.blank
+        target = self.neighbors[blank][action]
+        self.board_value += self.tile_delta(board, target, blank)
+        board[blank], board[target] = board[target], 0
+        self.blank = target
+
+    def undo(self, action):
+        """ Take back a previous apply(action) """
+
+        self.apply(self.inverse[action])
+
+    def board_goal_test(self):
+        # Each of the heuristics is 0 exactly on the goal
+        return self.board_value == 0
+
+    def board_h(self):
+        return self.board_value
+
+
+class NPuzzle(Problem):
+    """ The sliding-tile puzzle on a width x width board: the 15-puzzle for width 4,
+    the 24-puzzle for width 5. States are packed into one int: square i holds tile
+    (state >> bits * i) & mask, with 4 bits per tile up to the 15-puzzle, 5 up to the
+    24-puzzle and more beyond, and the square of the blank is kept in the bits above
+    the board, so that actions and result never have to search for it. Use pack and
+    unpack to convert between packed states and tuples of tiles. """
+
+    def __init__(self, initial, goal=None, width=4):
+        """ initial and goal may be given as tuples of tiles or as packed states;
+        the default goal is (1, 2, ..., n - 1, 0) """
+
+        self.width = width
+        self.size = width * width
+        self.bits = (self.size - 1).bit_length()
+        self.mask = (1 << self.bits) - 1
+        self.blank_shift = self.bits * self.size
+        if goal is None:
+            goal = tuple(range(1, self.size)) + (0,)
+        self.actions_table, self.neighbors = sliding_tile_moves(width)
+        super().__init__(self.pack(initial), self.pack(goal))
+        goal_tiles = self.unpack(self.goal)
+        goal_square = [0] * self.size
+        for square, tile in enumerate(goal_tiles):
+            goal_square[tile] = square
+        # distance[tile][square]: Manhattan distance from square to the tile's goal (0 for the blank)
+        self.distance = [[(abs(square // width - goal_square[tile] // width) +
+                           abs(square % width - goal_square[tile] % width)) * (tile != 0)
+                          for square in range(self.size)] for tile in range(self.size)]
+        self.board_moves = []
+        for actions in self.actions_table:
+            self.board_moves.append({last: [a for a in actions if a != EightPuzzle.inverse.get(last)]
+                                     for last in (None,) + actions + tuple(EightPuzzle.inverse[a] for a in actions)})
+        self.board = None
+
+    def reversed(self):
+        """ The same puzzle from goal back to initial, with its tables built for that goal """
+
+        return type(self)(self.goal, self.initial, self.width)
+
+    def pack(self, tiles):
+        """ Return the packed state for a sequence of tiles; packed states are returned as they are """
+
+        if isinstance(tiles, int):
+            return tiles
+        if sorted(tiles) != list(range(self.size)):
+            raise ValueError("expected the tiles 0..{} once each, got {}".format(self.size - 1, tiles))
+        state = tiles.index(0)
+        for tile in reversed(tiles):
+            state = (state << self.bits) | tile
+        return state
+
+    def unpack(self, state):
+        """ Return the tuple of tiles of a packed state """
+
+        bits, mask = self.bits, self.mask
+        return tuple((state >> bits * square) & mask for square in range(self.size))
+
+    def find_blank_square(self, state):
+        """Return the index of the blank square in a given state"""
+
+        return state >> self.blank_shift
+
+    def actions(self, state):
+        """ Return the actions that can be executed in the given state;
+        the tuple returned is shared, do not modify it """
+
+        return self.actions_table[state >> self.blank_shift]
+
+    def result(self, state, action):
+        """ Given state and action, return a new state that is the result of the action.
+        Action is assumed to be a valid action in the state """
+
+        blank = state >> self.blank_shift
+        square = self.neighbors[blank][action]
+        bits = self.bits
+        tile = (state >> bits * square) & self.mask
+        # The tile moves from square onto the blank, and square becomes the blank
+        return (state + (tile << bits * blank) - (tile << bits * square)
+                + ((square - blank) << self.blank_shift))
+
+    def goal_test(self, state):
+        """ Given a state, return True if state is a goal state or False, otherwise """
+
+        return state == self.goal
+
+    def predecessors(self, state):
+        """ Return (action, previous state) pairs; every move is undone by its inverse """
+
+        inverse = EightPuzzle.inverse
+        return [(inverse[action], self.result(state, action)) for action in self.actions(state)]
+
+    def parity(self, tiles):
+        """ Parity of the inversions among the tiles, counted as in
+        EightPuzzle.check_solvability, plus on boards of even width the row of
+        the blank; no move changes it """
+
+        inversion = 0
+        for i in range(len(tiles)):
+            for j in range(i + 1, len(tiles)):
+                if (tiles[i] > tiles[j]) and tiles[i] != 0 and tiles[j] != 0:
+                    inversion += 1
+        if self.width % 2 == 0:
+            inversion += tiles.index(0) // self.width
+        return inversion % 2
+
+    def check_solvability(self, state):
+        """ Checks if the goal can be reached from the given state
+        (packed or a tuple of tiles) """
+
+        return self.parity(self.unpack(self.pack(state))) == self.parity(self.unpack(self.goal))
+
+    def h(self, node):
+        """ Return the heuristic value for a given state: the sum of the
+        Manhattan distances of the tiles to their goal squares """
+
+        state, bits, mask, distance = node.state, self.bits, self.mask, self.distance
+        return sum(distance[(state >> bits * square) & mask][square] for square in range(self.size))
+
+    def h_delta(self, state, action, child):
+        """ Return h(child) - h(state), where child = result(state, action) """
+
+        blank = state >> self.blank_shift
+        square = self.neighbors[blank][action]
+        distance = self.distance[(state >> self.bits * square) & self.mask]
+        return distance[blank] - distance[square]
+
+    # In-place board protocol, used by iterative_deepening_astar_search; as
+    # for EightPuzzle, the board is a list of tiles.
+
+    def load(self, state):
+        """ Make state the current board """
+
+        self.board = list(self.unpack(state))
+        self.blank = self.board.index(0)
+        self.board_value = sum(self.distance[tile][square] for square, tile in enumerate(self.board))
+
+    def board_actions(self, last_action=None):
+        """ Return the actions for the current board, except the one that
+        would undo last_action """
+
+        return self.board_moves[self.blank][last_action]
+
+    def apply(self, action):
+        """ Slide the blank of the current board in the given direction """
+
+        board, blank = self.board, self.blank
+        target = self.neighbors[blank][action]
+        distance = self.distance[board[target]]
+        self.board_value += distance[blank] - distance[target]
+        board[blank], board[target] = board[target], 0
+        self.blank = target
+
+    def undo(self, action):
+        """ Take back a previous apply(action) """
+
+        self.apply(EightPuzzle.inverse[action])
+
+    def board_goal_test(self):
+        # The Manhattan distance is 0 exactly on the goal
+        return self.board_value == 0
+
+    def board_h(self):
+        return self.board_value
+
+
+# ______________________________________________________________________________
+# Pattern databases and distance tables for sliding-tile puzzles
+
+
+class PatternDatabase:
+    """A pattern database: for every placement of a subset of the tiles (the
+    pattern), the number of moves of those tiles needed to bring them to
+    their goal squares, ignoring all other tiles. The table is built once by
+    a backward breadth-first search from the goal over the abstract states
+    (pattern tile squares plus the blank square), in which sliding a pattern
+    tile costs 1 and sliding any other tile is free. Entries are stored one
+    byte each in a bytearray, indexed by the squares of the pattern tiles
+    read as digits in base len(goal).
+
+    Since only pattern tiles are counted, databases over disjoint tile sets
+    can be added together and still never overestimate; see
+    PatternDatabaseHeuristic."""
+
+    MAGIC = b'PDB1'
+
+    def __init__(self, goal, tiles, width=3, table=None):
+        self.goal = tuple(goal)
+        self.tiles = tuple(tiles)
+        self.width = width
+        self.table = self.build() if table is None else table
+
+    def build(self):
+        """Return the table, computed by 0-1 breadth-first search from the goal."""
+        n, width, k = len(self.goal), self.width, len(self.tiles)
+        neighbors = [[j for j in (i - width, i + width) if 0 <= j < n] +
+                     [j for j in (i - 1, i + 1) if 0 <= j < n and j // width == i // width]
+                     for i in range(n)]
+        table = bytearray(b'\xff') * n ** k
+        seen = bytearray(n ** (k + 1))
+        start = tuple(self.goal.index(t) for t in self.tiles)
+        frontier = deque([(0, start, self.goal.index(0))])
+        while frontier:
+            cost, squares, blank = frontier.popleft()
+            code = self.code(squares)
+            if seen[code * n + blank]:
+                continue
+            seen[code * n + blank] = 1
+            if cost < table[code]:
+                table[code] = cost
+            for square in neighbors[blank]:
+                if square in squares:
+                    moved = tuple(blank if s == square else s for s in squares)
+                    frontier.append((cost + 1, moved, square))
+                elif not seen[code * n + square]:
+                    frontier.appendleft((cost, squares, square))
+        return table
+
+    def code(self, squares):
+        """Table index for the pattern tiles sitting on the given squares."""
+        code, n = 0, len(self.goal)
+        for square in squares:
+            code = code * n + square
+        return code
+
+    def lookup(self, state):
+        """Moves needed by the pattern tiles of state (a tuple or list)."""
+        code, n = 0, len(self.goal)
+        for tile in self.tiles:
+            code = code * n + state.index(tile)
+        return self.table[code]
+
+    def save(self, filename):
+        """Write the table to filename, after a small header."""
+        with open(filename, 'wb') as file:
+            file.write(self.MAGIC)
+            file.write(struct.pack('BBB', self.width, len(self.goal), len(self.tiles)))
+            file.write(bytes(self.goal) + bytes(self.tiles))
+            file.write(self.table)
+
+    @classmethod
+    def load(cls, filename):
+        """Memory-map a table written by save; pages are read on demand and
+        shared between processes that load the same file."""
+        with open(filename, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if data[:4] != cls.MAGIC:
+            raise ValueError('{} is not a pattern database'.format(filename))
+        width, n, k = struct.unpack_from('BBB', data, 4)
+        offset = 7 + n + k
+        goal, tiles = tuple(data[7:7 + n]), tuple(data[7 + n:offset])
+        return cls(goal, tiles, width, memoryview(data)[offset:])
+
+
+class PatternDatabaseHeuristic:
+    """Additive pattern-database heuristic: the sum of the lookups in pattern
+    databases over disjoint sets of tiles. It can be passed as h to
+    astar_search, iterative_deepening_astar_search and
+    recursive_best_first_search, and accepts a Node or a bare state."""
+
+    def __init__(self, databases):
+        self.databases = databases
+
+    def __call__(self, node):
+        state = getattr(node, 'state', node)
+        return sum(db.lookup(state) for db in self.databases)
+
+    @classmethod
+    def for_problem(cls, problem, tile_groups=None, width=3, directory=None):
+        """Pattern databases for a sliding-tile problem's goal. The default
+        groups split the tiles into two halves. Each table is memory-mapped
+        from directory (next to this module by default) and only built and
+        written there the first time it is needed."""
+        goal = problem.goal
+        if tile_groups is None:
+            tiles = sorted(t for t in goal if t != 0)
+            tile_groups = [tiles[:len(tiles) // 2], tiles[len(tiles) // 2:]]
+        if directory is None:
+            directory = os.path.dirname(os.path.abspath(__file__))
+        databases = []
+        for tiles in tile_groups:
+            filename = os.path.join(directory, 'pattern_{}_{}.pdb'.format(
+                '-'.join(map(str, goal)), '-'.join(map(str, tiles))))
+            if not os.path.exists(filename):
+                PatternDatabase(goal, tiles, width).save(filename)
+            databases.append(PatternDatabase.load(filename))
+        return cls(databases)
+
+
+class DistanceTable:
+    """Retrograde table for EightPuzzle: for every one of the 9! state ranks,
+    one byte holding the number of moves to the goal (shifted left by 2) and,
+    in the low 2 bits, the index in MOVES of an optimal first move; 255 marks
+    states from which the goal cannot be reached. It is built once by
+    breadth-first search backward from the goal, layer by layer over ranks,
+    after which solving any state is a walk that follows the stored moves.
+    Called with a Node or a state, the table is the perfect heuristic."""
+
+    MAGIC = b'DST1'
+    MOVES = ('UP', 'DOWN', 'LEFT', 'RIGHT')
+
+    def __init__(self, problem, table=None):
+        self.problem = problem
+        self.table = self.build() if table is None else table
+
+    def build(self):
+        """Return the table, computed by breadth-first search from the goal."""
+        problem, moves = self.problem, self.MOVES
+        rank, unrank = problem.rank, problem.unrank
+        table = bytearray(b'\xff') * problem.state_count
+        table[rank(problem.goal)] = 0
+        layer, distance = [rank(problem.goal)], 0
+        while layer:
+            distance += 1
+            next_layer = array('l')
+            for r in layer:
+                state = unrank(r)
+                for action in problem.actions(state):
+                    child = rank(problem.result(state, action))
+                    if table[child] == 255:
+                        # From child, the inverse move leads back toward the goal
+                        table[child] = distance << 2 | moves.index(problem.inverse[action])
+                        next_layer.append(child)
+            layer = next_layer
+        return table
+
+    def distance(self, state):
+        """Number of moves from state to the goal, or None if it is unsolvable."""
+        entry = self.table[self.problem.rank(state)]
+        return None if entry == 255 else entry >> 2
+
+    def __call__(self, node):
+        return self.distance(getattr(node, 'state', node))
+
+    def solution(self, state):
+        """An optimal list of actions from state to the goal, or None."""
+        rank, result, table, moves = self.problem.rank, self.problem.result, self.table, self.MOVES
+        entry = table[rank(state)]
+        if entry == 255:
+            return None
+        actions = []
+        while entry:
+            action = moves[entry & 3]
+            actions.append(action)
+            state = result(state, action)
+            entry = table[rank(state)]
+        return actions
+
+    def save(self, filename):
+        """Write the table to filename, after a small header."""
+        goal = self.problem.goal
+        with open(filename, 'wb') as file:
+            file.write(self.MAGIC)
+            file.write(struct.pack('B', len(goal)) + bytes(goal))
+            file.write(self.table)
+
+    @classmethod
+    def load(cls, problem, filename):
+        """Memory-map a table written by save for problem's goal."""
+        with open(filename, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        n = data[4] if data[:4] == cls.MAGIC else 0
+        if tuple(data[5:5 + n]) != tuple(problem.goal):
+            raise ValueError('{} is not a distance table for goal {}'.format(filename, problem.goal))
+        return cls(problem, memoryview(data)[5 + n:])
+
+    @classmethod
+    def for_problem(cls, problem, directory=None):
+        """The table for problem's goal, memory-mapped from directory (next to
+        this module by default) and only built and written there the first
+        time it is needed."""
+        if directory is None:
+            directory = os.path.dirname(os.path.abspath(__file__))
+        filename = os.path.join(directory, 'distance_{}.tbl'.format('-'.join(map(str, problem.goal))))
+        if not os.path.exists(filename):
+            cls(problem).save(filename)
+        return cls.load(problem, filename)
+
+
+@budgeted
+def distance_table_search(problem, table=None):
+    """Solve problem by walking its DistanceTable (by default the one for
+    problem's goal, see DistanceTable.for_problem) instead of searching.
+    Returns the goal Node of an optimal path, or None."""
+    if table is None:
+        table = DistanceTable.for_problem(problem)
+    actions = table.solution(problem.initial)
+    if actions is None:
+        return None
+    node = Node(problem.initial)
+    for action in actions:
+        node = node.child_node(problem, action)
+    return node
+
 
 # ______________________________________________________________________________
 
@@ -703,9 +2416,10 @@ class PlanRoute(Problem):
 # Other search algorithms
 
 
+@budgeted
 def recursive_best_first_search(problem, h=None):
     """[Figure 3.26]"""
-    h = memoize(h or problem.h, 'h')
+    h = incremental_h(problem, h)
 
     def RBFS(problem, node, flimit):
         if problem.goal_test(node.state):
@@ -735,6 +2449,98 @@ def recursive_best_first_search(problem, h=None):
     return result
 
 
+@budgeted
+def iterative_deepening_astar_search(problem, h=None):
+    """IDA*: a series of depth-first searches, each cut off where
+    f = g + h exceeds a bound. The first bound is h(initial); each later one
+    is the smallest f that exceeded the previous bound. Optimal for an
+    admissible h, with memory linear in the solution depth.
+
+    If the problem implements the in-place board protocol (load,
+    board_actions, apply, undo, board_goal_test and board_h, with unit step
+    costs, as EightPuzzle does), the search runs on the problem's single
+    mutable board and allocates no nodes while searching; a given h is then
+    called with one Node whose state is that board. Otherwise nodes are
+    expanded as usual, skipping states already on the current path."""
+    if hasattr(problem, 'apply'):
+        return _board_ida_star(problem, h)
+
+    h = incremental_h(problem, h)
+    path = set()
+
+    def search(node, bound):
+        f = node.path_cost + h(node)
+        if f > bound:
+            return None, f
+        if problem.goal_test(node.state):
+            return node, f
+        path.add(node.state)
+        next_bound = np.inf
+        for child in node.expand(problem):
+            if child.state not in path:
+                result, t = search(child, bound)
+                if result is not None:
+                    return result, t
+                next_bound = min(next_bound, t)
+        path.discard(node.state)
+        return None, next_bound
+
+    node = Node(problem.initial)
+    bound = h(node)
+    while bound < np.inf:
+        result, bound = search(node, bound)
+        if result is not None:
+            return result
+    return None
+
+
+def _board_ida_star(problem, h=None):
+    """IDA* over the in-place board protocol; see iterative_deepening_astar_search."""
+    problem.load(problem.initial)
+    if h is None:
+        board_h = problem.board_h
+    else:
+        probe = Node(problem.board)
+        board_h = lambda: h(probe)
+    board_actions, apply, undo = problem.board_actions, problem.apply, problem.undo
+    goal_test = problem.board_goal_test
+    actions = []
+
+    def search(g, bound, last):
+        f = g + board_h()
+        if f > bound:
+            return f
+        if goal_test():
+            return None
+        next_bound = np.inf
+        for action in board_actions(last):
+            apply(action)
+            t = search(g + 1, bound, action)
+            if t is None:
+                actions.append(action)
+                return None
+            undo(action)
+            if t < next_bound:
+                next_bound = t
+        return next_bound
+
+    bound = board_h()
+    while bound < np.inf:
+        bound = search(0, bound, None)
+        if bound is None:
+            node = Node(problem.initial)
+            for action in reversed(actions):
+                node = node.child_node(problem, action)
+            return node
+    return None
+
+
+# Searchers that return an optimal solution when h is admissible; see portfolio_search
+OPTIMAL_SEARCHERS = (uniform_cost_search, astar_search, iterative_deepening_astar_search,
+                     recursive_best_first_search)
+
+
+@budgeted
 def hill_climbing(problem):
     """
     [Figure 4.2]
@@ -758,6 +2564,7 @@ def exp_schedule(k=20, lam=0.005, limit=100):
     return lambda t: (k * np.exp(-lam * t) if t < limit else 0)
 
 
+@budgeted
 def simulated_annealing(problem, schedule=exp_schedule()):
     """[Figure 4.5] CAUTION: This differs from the pseudocode as it
     returns a state instead of a Node."""
@@ -775,6 +2582,7 @@ def simulated_annealing(problem, schedule=exp_schedule()):
             current = next_choice
 
 
+@budgeted
 def simulated_annealing_full(problem, schedule=exp_schedule()):
     """ This version returns all the states encountered in reaching
     the goal state."""
@@ -794,6 +2602,7 @@ def simulated_annealing_full(problem, schedule=exp_schedule()):
             current = next_choice
 
 
+@budgeted
 def and_or_graph_search(problem):
     """[Figure 4.11]Used when the environment is nondeterministic and completely observable.
     Contains OR nodes where the agent is free to choose any action.
@@ -995,7 +2804,6 @@ class LRTAStarAgent:
     def LRTA_cost(self, s, a, s1, H):
         """Returns cost to move from state 's' to state 's1' plus
         estimated cost to get to goal from s1."""
-        print(s, a, s1)
         if s1 is None:
             return self.problem.h(s)
         else:
@@ -1179,18 +2987,40 @@ def RandomGraph(nodes=list(range(10)), min_links=2, width=400, height=300,
     # Build the cities
     for node in nodes:
         g.locations[node] = (random.randrange(width), random.randrange(height))
+    # The nearest neighbor is looked for in rings of grid cells around the
+    # city, about one city per cell, rather than among all the cities; ties
+    # go to the city listed first, as they would with min(nodes, ...).
+    cell = max(1.0, math.sqrt(width * height / max(len(nodes), 1)))
+    grid = defaultdict(list)
+    for node in nodes:
+        x, y = g.locations[node]
+        grid[int(x // cell), int(y // cell)].append(node)
+    order = {node: i for i, node in enumerate(nodes)}
+    rings = int(max(width, height) // cell) + 1
+
+    def nearest(node):
+        here = g.locations[node]
+        cx, cy = int(here[0] // cell), int(here[1] // cell)
+        best, best_distance = None, np.inf
+        for r in range(rings + 1):
+            if best_distance < (r - 1) * cell:  # cities in ring r and beyond are farther
+                break
+            for dx in range(-r, r + 1):
+                for dy in (range(-r, r + 1) if abs(dx) == r else (-r, r)):
+                    for n in grid.get((cx + dx, cy + dy), ()):
+                        if n is node or g.get(node, n):
+                            continue
+                        d = distance(g.locations[n], here)
+                        if d < best_distance or (d == best_distance and order[n] < order[best]):
+                            best, best_distance = n, d
+        return nodes[0] if best is None else best
+
     # Build roads from each city to at least min_links nearest neighbors.
     for i in range(min_links):
         for node in nodes:
             if len(g.get(node)) < min_links:
                 here = g.locations[node]
-
-                def distance_to_node(n):
-                    if n is node or g.get(node, n):
-                        return np.inf
-                    return distance(g.locations[n], here)
-
-                neighbor = min(nodes, key=distance_to_node)
+                neighbor = nearest(node)
                 d = distance(g.locations[neighbor], here) * curvature()
                 g.connect(node, neighbor, int(d))
     return g
@@ -1883,6 +3713,11 @@ class GraphProblem(Problem):
     def __init__(self, initial, goal, graph):
         super().__init__(initial, goal)
         self.graph = graph
+        self.reverse_links = None
+
+    def reversed(self):
+        """The problem of searching the same graph from goal to initial."""
+        return type(self)(self.goal, self.initial, self.graph)
 
     def actions(self, A):
         """The actions at a graph node are just its neighbors."""
@@ -1895,6 +3730,18 @@ class GraphProblem(Problem):
     def path_cost(self, cost_so_far, A, action, B):
         return cost_so_far + (self.graph.get(A, B) or np.inf)
 
+    def predecessors(self, B):
+        """The action into B is B itself, from each node with a link to B.
+        For a directed graph the links are indexed by their end the first time."""
+        if not self.graph.directed:
+            return [(B, A) for A in self.graph.get(B)]
+        if self.reverse_links is None:
+            self.reverse_links = defaultdict(list)
+            for A, links in self.graph.graph_dict.items():
+                for C in links:
+                    self.reverse_links[C].append(A)
+        return [(B, A) for A in self.reverse_links.get(B, ())]
+
     def find_min_edge(self):
         """Find minimum value of edges."""
         m = np.inf
@@ -2216,35 +4063,109 @@ def mutate_boggle(board):
 
 
 class InstrumentedProblem(Problem):
-    """Delegates to a problem, and keeps statistics."""
-
-    def __init__(self, problem):
+    """Delegates to a problem, and keeps statistics: succs (calls of
+    actions, or of board_actions for the in-place board protocol),
+    goal_tests, states (children generated) and found (on the board, the
+    tuple of its tiles). With timing=True it also adds up, in self.times, the
+    seconds spent in actions, result, goal_test, path_cost and h (h_delta
+    included), and on the board in board_actions, apply and undo,
+    board_goal_test and board_h under the same keys. The graph searchers
+    report the sizes of their frontier and explored set to observe, which
+    keeps the peaks in max_frontier and max_explored.
+
+    The wrapped problem's methods are bound to the instance up front, so a
+    call through the wrapper costs one extra call at most and does not go
+    through __getattr__."""
+
+    def __init__(self, problem, timing=False):
         self.problem = problem
         self.succs = self.goal_tests = self.states = 0
         self.found = None
+        self.max_frontier = self.max_explored = 0
+        self.times = {}
+        self._actions, self._result, self._goal_test = problem.actions, problem.result, problem.goal_test
+        self.path_cost, self.value = problem.path_cost, problem.value
+        if hasattr(problem, 'h'):
+            self.h = problem.h
+        if hasattr(problem, 'board_actions'):
+            self._bind_board(problem)
+        if timing:
+            self.times = dict.fromkeys(('actions', 'result', 'goal_test', 'path_cost', 'h'), 0.0)
+            for name in ('actions', 'result', 'goal_test', 'path_cost', 'h'):
+                if hasattr(self, name):
+                    setattr(self, name, self._timed(name, getattr(self, name)))
+            if hasattr(problem, 'h_delta'):
+                self.h_delta = self._timed('h', problem.h_delta)
+            if hasattr(problem, 'board_actions'):
+                for name, key in (('board_actions', 'actions'), ('apply', 'result'), ('undo', 'result'),
+                                  ('board_goal_test', 'goal_test'), ('board_h', 'h')):
+                    setattr(self, name, self._timed(key, getattr(self, name)))
 
     def actions(self, state):
         self.succs += 1
-        return self.problem.actions(state)
+        return self._actions(state)
 
     def result(self, state, action):
         self.states += 1
-        return self.problem.result(state, action)
+        return self._result(state, action)
 
     def goal_test(self, state):
         self.goal_tests += 1
-        result = self.problem.goal_test(state)
+        result = self._goal_test(state)
         if result:
             self.found = state
         return result
 
-    def path_cost(self, c, state1, action, state2):
-        return self.problem.path_cost(c, state1, action, state2)
+    def predecessors(self, state):
+        return self.problem.predecessors(state)
 
-    def value(self, state):
-        return self.problem.value(state)
+    def observe(self, frontier, explored):
+        """Called by the graph searchers with the current frontier and
+        explored-set sizes."""
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+        if explored > self.max_explored:
+            self.max_explored = explored
+
+    def _timed(self, name, method):
+        """method, adding the time each call takes to self.times[name]."""
+        times, clock = self.times, time.perf_counter
+
+        def timed(*args):
+            start = clock()
+            try:
+                return method(*args)
+            finally:
+                times[name] += clock() - start
+
+        return timed
+
+    def _bind_board(self, problem):
+        """Count the in-place board protocol (see iterative_deepening_astar_search)
+        like actions, result and goal_test."""
+        board_actions, apply, board_goal_test = problem.board_actions, problem.apply, problem.board_goal_test
+
+        def counted_board_actions(last_action=None):
+            self.succs += 1
+            return board_actions(last_action)
+
+        def counted_apply(action):
+            self.states += 1
+            apply(action)
+
+        def counted_board_goal_test():
+            self.goal_tests += 1
+            result = board_goal_test()
+            if result:
+                self.found = tuple(problem.board)
+            return result
+
+        self.board_actions, self.apply, self.board_goal_test = (counted_board_actions, counted_apply,
+                                                                counted_board_goal_test)
 
     def __getattr__(self, attr):
+        if attr == 'problem':  # not set yet, as while copying or unpickling
+            raise AttributeError(attr)
         return getattr(self.problem, attr)
 
     def __repr__(self):
@@ -2252,20 +4173,198 @@ class InstrumentedProblem(Problem):
                                                self.states, str(self.found)[:4])
 
 
+class HookedProblem(Problem):
+    """Delegates to a problem, and calls back on search events:
+        on_expand(state)                when the successors of state are asked for
+        on_generate(state, action, child)  when a child state is generated
+        on_goal(state)                  when a goal test succeeds
+        on_prune(node)                  when a graph search drops a child node
+                                        already explored or on the frontier
+        on_reopen(node)                 when a best-first search replaces a
+                                        costlier frontier node by node
+    With every=n only the 1st, (n+1)-th, (2n+1)-th, ... expand, generate and
+    prune events are passed on, so the first one of each kind always is;
+    goal and reopen events are rare, and are all passed on.
+
+    Only the methods that have a hook are wrapped; the others are the
+    wrapped problem's own, bound to the instance, and the graph searchers
+    look on_prune and on_reopen up once per search, so a search without
+    hooks costs the same as on the bare problem. The in-place board
+    protocol is hidden while an expand, generate or goal hook is set, so
+    that iterative_deepening_astar_search goes through actions and result."""
+
+    board_protocol = ('load', 'board_actions', 'apply', 'undo', 'board_goal_test', 'board_h')
+
+    def __init__(self, problem, on_expand=None, on_generate=None, on_goal=None,
+                 on_prune=None, on_reopen=None, every=1):
+        self.problem = problem
+        self.every = every
+        self.actions, self.result, self.goal_test = problem.actions, problem.result, problem.goal_test
+        self.path_cost, self.value = problem.path_cost, problem.value
+        if on_expand:
+            self.actions = self._hooked_actions(problem.actions, self._sampled(on_expand))
+        if on_generate:
+            self.result = self._hooked_result(problem.result, self._sampled(on_generate))
+        if on_goal:
+            self.goal_test = self._hooked_goal_test(problem.goal_test, on_goal)
+        self.on_prune = on_prune and self._sampled(on_prune)
+        self.on_reopen = on_reopen
+        self.hides_board = bool(on_expand or on_generate or on_goal)
+
+    def predecessors(self, state):
+        return self.problem.predecessors(state)
+
+    def _sampled(self, hook):
+        """hook, called on the first event and then on every self.every-th."""
+        if self.every == 1:
+            return hook
+        every, count = self.every, [0]
+
+        def sampled(*args):
+            if count[0] == 0:
+                hook(*args)
+            count[0] = (count[0] + 1) % every
+
+        return sampled
+
+    @staticmethod
+    def _hooked_actions(actions, hook):
+        def hooked_actions(state):
+            hook(state)
+            return actions(state)
+
+        return hooked_actions
+
+    @staticmethod
+    def _hooked_result(result, hook):
+        def hooked_result(state, action):
+            child = result(state, action)
+            hook(state, action, child)
+            return child
+
+        return hooked_result
+
+    @staticmethod
+    def _hooked_goal_test(goal_test, hook):
+        def hooked_goal_test(state):
+            found = goal_test(state)
+            if found:
+                hook(state)
+            return found
+
+        return hooked_goal_test
+
+    def __getattr__(self, attr):
+        if attr in ('problem', 'hides_board') or attr in self.board_protocol and self.hides_board:
+            raise AttributeError(attr)
+        return getattr(self.problem, attr)
+
+
 def compare_searchers(problems, header,
                       searchers=[breadth_first_tree_search,
                                  breadth_first_graph_search,
                                  depth_first_graph_search,
                                  iterative_deepening_search,
                                  depth_limited_search,
-                                 recursive_best_first_search]):
-    def do(searcher, problem):
-        p = InstrumentedProblem(problem)
+                                 recursive_best_first_search],
+                      timeout=60, memory=None, processes=None):
+    """Run every searcher on every problem and print a table of the
+    InstrumentedProblem counters, <successors/goal tests/states/found>.
+    Each cell runs in a process of its own, at most processes (default
+    os.cpu_count()) at a time. A cell still running after timeout seconds is
+    killed and shown as 'timeout'; with memory, a cap in bytes on the
+    address space each cell may add (Unix only), one that runs out is shown
+    as 'OOM'. A searcher that raises shows the name of the exception, and a
+    process that dies without reporting shows 'killed (<signal number>)' or
+    'exit <status>'.
+    Returns the table, without the header."""
+    table = [[name(s)] + [None] * len(problems) for s in searchers]
+    pending = deque((row, column, searcher, problem) for row, searcher in enumerate(searchers)
+                    for column, problem in enumerate(problems))
+    processes = processes or os.cpu_count() or 1
+    running = {}  # pipe -> (row, column, problem, process, deadline)
+    while pending or running:
+        while pending and len(running) < processes:
+            row, column, searcher, problem = pending.popleft()
+            here, there = multiprocessing.Pipe(duplex=False)
+            worker = multiprocessing.Process(target=_compare_worker, args=(searcher, problem, memory, there),
+                                             daemon=True)
+            worker.start()
+            there.close()
+            running[here] = (row, column, problem, worker,
+                             None if timeout is None else time.perf_counter() + timeout)
+        deadlines = [cell[4] for cell in running.values() if cell[4] is not None]
+        wait = max(0, min(deadlines) - time.perf_counter()) if deadlines else None
+        ready = multiprocessing.connection.wait(list(running), wait)
+        now = time.perf_counter()
+        for conn in list(running):
+            row, column, problem, worker, deadline = running[conn]
+            if conn in ready:
+                try:
+                    result = conn.recv()
+                except EOFError:  # died before it could report
+                    worker.join()
+                    code = worker.exitcode
+                    result = 'killed ({})'.format(-code) if code < 0 else 'exit {}'.format(code)
+            elif deadline is not None and now >= deadline:
+                worker.terminate()
+                result = 'timeout'
+            else:
+                continue
+            worker.join()
+            del running[conn]
+            if isinstance(result, tuple):
+                # The counters come back from the worker; show them the usual way
+                p = InstrumentedProblem(problem)
+                p.succs, p.goal_tests, p.states, p.found = result
+                result = p
+            table[row][column + 1] = result
+    print_table(list(table), header)
+    return table
+
+
+def _compare_worker(searcher, problem, memory, conn):
+    """Run one cell of compare_searchers and send back its counters."""
+    if memory is not None:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (_address_space() + memory,) * 2)
+    p = InstrumentedProblem(problem)
+    try:
         searcher(p)
-        return p
-
-    table = [[name(s)] + [do(s, p) for p in problems] for s in searchers]
-    print_table(table, header)
+    except MemoryError:
+        conn.send('OOM')
+        return
+    except Exception as e:
+        conn.send(type(e).__name__)
+        return
+    conn.send((p.succs, p.goal_tests, p.states, p.found))
+
+
+def _address_space():
+    """Bytes of address space in use by this process, or 0 where /proc is missing."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _resident_memory():
+    """Bytes of resident memory of this process. Where /proc is missing, the
+    peak resident memory from getrusage, which never goes down, so a budget
+    on it may run out early; None where neither can be read (Windows)."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes, except on macOS where it is in bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
 
 
 def compare_graph_searchers():
@@ -0,0 +1,474 @@
+"""
+Benchmarks for search.py.
+
+Run from the LD1 directory:
+    python search_benchmarks.py run [--repeat 5] [--timeout 60] [--output results.json]
+    python search_benchmarks.py compare baseline.json results.json
+    python search_benchmarks.py micro
+
+run times every algorithm of the suite on fixed-seed instances of each
+problem family, each case in a fresh process, and writes nodes expanded,
+nodes/sec, wall times and peak memory to JSON. compare checks a run against
+a saved baseline and exits with status 1 if any case got significantly
+slower. micro prints the node size, expansion-rate, hook overhead,
+anytime, focal and beam search, and parallel search measurements.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import multiprocessing.connection
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import maps
+import search
+from search import (Node, EightPuzzle, NPuzzle, GraphProblem, NQueensProblem, RandomGraph, DistanceTable,
+                    HookedProblem, InstrumentedProblem, PatternDatabaseHeuristic, SearchBudget,
+                    anytime_weighted_astar_search, astar_search, beam_search, beam_stack_search, bidirectional_search,
+                    bidirectional_breadth_first_search, breadth_first_graph_search, depth_first_graph_search,
+                    focal_search, greedy_search, hash_distributed_astar_search, iterative_deepening_astar_search,
+                    parallel_breadth_first_search, recursive_best_first_search, uniform_cost_search)
+from WaterJugProblem import WaterJugProblem
+
+# The two EightPuzzle instances that need 31 moves, the maximum
+HARD_EIGHT_PUZZLES = [(8, 6, 7, 2, 5, 4, 3, 0, 1), (6, 4, 7, 8, 5, 0, 3, 2, 1)]
+
+# 15-puzzle instances 18 and 42 moves from the goal
+FIFTEEN_PUZZLE_18 = (1, 2, 4, 7, 10, 14, 3, 8, 5, 11, 0, 6, 9, 13, 15, 12)
+FIFTEEN_PUZZLE_42 = (11, 13, 4, 3, 2, 9, 1, 8, 0, 10, 6, 7, 14, 5, 15, 12)
+
+
+def node_bytes(n=100000):
+    """Average number of bytes allocated per search Node, measured with
+    tracemalloc over n child nodes that carry cached f and h values."""
+    root = Node((0,))
+    states = [(i,) for i in range(n)]
+    nodes = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for state in states:
+        node = Node(state, root, 'UP', 1)
+        node.f = node.h = 1
+        nodes.append(node)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before - sys.getsizeof(nodes)) / n
+
+
+def timed(searcher, problem, h=None):
+    """Run searcher on problem; return (solution length, seconds)."""
+    start = time.perf_counter()
+    node = searcher(problem) if h is None else searcher(problem, h)
+    return len(node.solution()), time.perf_counter() - start
+
+
+def astar_vs_ida(instances=HARD_EIGHT_PUZZLES):
+    """Time astar_search and iterative_deepening_astar_search on EightPuzzle
+    instances, with the default misplaced-tiles h and with pattern databases."""
+    for state in instances:
+        problem = EightPuzzle(state)
+        for h_name, h in [('misplaced', None), ('pdb', PatternDatabaseHeuristic.for_problem(problem))]:
+            for searcher in (astar_search, iterative_deepening_astar_search):
+                moves, seconds = timed(searcher, EightPuzzle(state), h)
+                print("{} {:<32} {:<9} {:3d} moves {:8.3f} s".format(
+                    state, searcher.__name__, h_name, moves, seconds))
+
+
+def hooks_overhead(state=HARD_EIGHT_PUZZLES[0], repeat=5):
+    """Time astar_search on the bare EightPuzzle, through a HookedProblem
+    without hooks, and with every hook set, the expand, generate and prune
+    ones sampled 1 in 1000 (best of repeat runs each)."""
+    def ignore(*args):
+        pass
+
+    cases = [('bare', lambda problem: problem),
+             ('no hooks', HookedProblem),
+             ('all hooks, every=1000', lambda problem: HookedProblem(
+                 problem, ignore, ignore, ignore, ignore, ignore, every=1000))]
+    for name, wrap in cases:
+        best = float('inf')
+        for _ in range(repeat):
+            problem = wrap(EightPuzzle(state))
+            start = time.perf_counter()
+            astar_search(problem)
+            best = min(best, time.perf_counter() - start)
+        print("astar_search {:<24} {:8.3f} s".format(name, best))
+
+
+class LegacyEightPuzzle(EightPuzzle):
+    """EightPuzzle with actions and result as they were before the
+    precomputed move tables, kept to compare expansion rates."""
+
+    def actions(self, state):
+        possible_actions = ['UP', 'DOWN', 'LEFT', 'RIGHT']
+        index_blank_square = self.find_blank_square(state)
+        if index_blank_square % 3 == 0:
+            possible_actions.remove('LEFT')
+        if index_blank_square < 3:
+            possible_actions.remove('UP')
+        if index_blank_square % 3 == 2:
+            possible_actions.remove('RIGHT')
+        if index_blank_square > 5:
+            possible_actions.remove('DOWN')
+        return possible_actions
+
+    def result(self, state, action):
+        blank = self.find_blank_square(state)
+        new_state = list(state)
+        delta = {'UP': -3, 'DOWN': 3, 'LEFT': -1, 'RIGHT': 1}
+        neighbor = blank + delta[action]
+        new_state[blank], new_state[neighbor] = new_state[neighbor], new_state[blank]
+        return tuple(new_state)
+
+
+def expansion_rate(problem_class, repeat=5):
+    """Node.expand calls per second for problem_class, over the first 20000
+    states of a breadth-first sweep of the EightPuzzle (best of repeat runs)."""
+    problem = problem_class(HARD_EIGHT_PUZZLES[0])
+    nodes, frontier, seen = [], [Node(problem.goal)], {problem.goal}
+    while len(nodes) < 20000:
+        node = frontier.pop(0)
+        nodes.append(node)
+        for child in node.expand(problem):
+            if child.state not in seen:
+                seen.add(child.state)
+                frontier.append(child)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for node in nodes:
+            node.expand(problem)
+        best = min(best, time.perf_counter() - start)
+    return len(nodes) / best
+
+
+def parallel_bfs_speedup(process_counts=(1, 2, 4, 8)):
+    """Time breadth_first_graph_search against parallel_breadth_first_search
+    on each number of processes, on the 18 layers of the 15-puzzle up to
+    FIFTEEN_PUZZLE_18, and on a 5000-node RandomGraph searched for a node it
+    does not have, which sweeps the whole graph."""
+    random.seed(0)
+    graph = RandomGraph(list(range(5000)), min_links=4)
+    for name, problem in [('15-puzzle', NPuzzle(FIFTEEN_PUZZLE_18)), ('RandomGraph', GraphProblem(0, None, graph))]:
+        start = time.perf_counter()
+        breadth_first_graph_search(problem)
+        serial = time.perf_counter() - start
+        print("{:<12} serial     {:8.3f} s".format(name, serial))
+        for processes in process_counts:
+            start = time.perf_counter()
+            parallel_breadth_first_search(problem, processes)
+            seconds = time.perf_counter() - start
+            print("{:<12} {} processes {:7.3f} s  speedup {:.2f}".format(name, processes, seconds, serial / seconds))
+
+
+def hda_star_speedup(process_counts=(1, 2, 4, 8)):
+    """Time astar_search against hash_distributed_astar_search on each number
+    of processes, on FIFTEEN_PUZZLE_42 and on the two farthest-apart corners
+    of a 5000-node RandomGraph."""
+    random.seed(0)
+    graph = RandomGraph(list(range(5000)), min_links=4)
+    corners = sorted(graph.locations, key=lambda node: sum(graph.locations[node]))
+    for name, problem in [('15-puzzle', NPuzzle(FIFTEEN_PUZZLE_42)),
+                          ('RandomGraph', GraphProblem(corners[0], corners[-1], graph))]:
+        start = time.perf_counter()
+        cost = astar_search(problem).path_cost
+        serial = time.perf_counter() - start
+        print("{:<12} serial     {:8.3f} s  cost {}".format(name, serial, cost))
+        for processes in process_counts:
+            start = time.perf_counter()
+            cost = hash_distributed_astar_search(problem, processes=processes).path_cost
+            seconds = time.perf_counter() - start
+            print("{:<12} {} processes {:7.3f} s  cost {}  speedup {:.2f}".format(
+                name, processes, seconds, cost, serial / seconds))
+
+
+def anytime_profile(weight=2, seconds=30):
+    """For the Russia and India maps and three sliding-tile instances, time
+    astar_search, then list when anytime_weighted_astar_search found each
+    solution, its cost and its suboptimality bound (for up to seconds)."""
+    cases = []
+    for country in ('Russia', 'India'):
+        cases.append((country, make_problem('CountryMap', country)))
+    cases += [('8-puzzle 31', NPuzzle(HARD_EIGHT_PUZZLES[0], width=3)),
+              ('15-puzzle 18', NPuzzle(FIFTEEN_PUZZLE_18)), ('15-puzzle 42', NPuzzle(FIFTEEN_PUZZLE_42))]
+    for name, problem in cases:
+        start = time.perf_counter()
+        cost = astar_search(problem).path_cost
+        print("{:<12} astar_search     {:8.3f} s  cost {}".format(name, time.perf_counter() - start, cost))
+        start = time.perf_counter()
+        for node, bound in anytime_weighted_astar_search(problem, weight=weight, budget=SearchBudget(seconds=seconds)):
+            print("{:<12} anytime, w={:<4}  {:8.3f} s  cost {}  bound {:.3f}".format(
+                name, weight, time.perf_counter() - start, node.path_cost, bound))
+
+
+def focal_vs_astar(epsilons=(0.1, 0.5, 1.0)):
+    """Nodes expanded and solution cost of astar_search and of focal_search
+    for each epsilon, on the two 31-move EightPuzzle instances (Manhattan h),
+    the Russia and India maps and a 3000-node RandomGraph."""
+    cases = [(str(state), EightPuzzle(state, heuristic='manhattan')) for state in HARD_EIGHT_PUZZLES]
+    cases += [(name, make_problem(family, name)) for family, name in
+              [('CountryMap', 'Russia'), ('CountryMap', 'India'), ('RandomGraph', 'nodes-3000')]]
+    for name, problem in cases:
+        instrumented = InstrumentedProblem(problem)
+        optimal = astar_search(instrumented).path_cost
+        print("{:<28} astar_search         expanded {:7d}  cost {}".format(name, instrumented.succs, optimal))
+        astar_expanded = instrumented.succs
+        for epsilon in epsilons:
+            instrumented = InstrumentedProblem(problem)
+            cost = focal_search(instrumented, epsilon).path_cost
+            print("{:<28} focal_search eps={:<4} expanded {:7d}  cost {} ({:.3f} x optimal, "
+                  "{:.2f} x A* expansions)".format(name, epsilon, instrumented.succs, cost, cost / optimal,
+                                                   instrumented.succs / astar_expanded))
+
+
+def peak_memory(searcher, problem, *args, **kwargs):
+    """Run searcher under tracemalloc; return (result, seconds, peak bytes)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = searcher(problem, *args, **kwargs)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def beam_tradeoff(widths=(10, 100, 1000), seconds=60):
+    """Solution cost against peak memory of beam_search and beam_stack_search
+    for each width, next to astar_search, on two NPuzzle instances and a
+    100000-node RandomGraph. The graph is spread over 4000 x 3000 so that
+    its far corners are connected. beam_stack_search gets seconds per run."""
+    random.seed(0)
+    graph = RandomGraph(list(range(100000)), min_links=4, width=4000, height=3000)
+    corners = sorted(graph.locations, key=lambda node: sum(graph.locations[node]))
+    cases = [('8-puzzle 31', NPuzzle(HARD_EIGHT_PUZZLES[0], width=3)), ('15-puzzle 42', NPuzzle(FIFTEEN_PUZZLE_42)),
+             ('RandomGraph 100000', GraphProblem(corners[0], corners[-1], graph))]
+    for name, problem in cases:
+        runs = [('astar_search', astar_search, ())]
+        for width in widths:
+            runs += [('beam_search w={}'.format(width), beam_search, (width,)),
+                     ('beam_stack_search w={}'.format(width), beam_stack_search, (width,))]
+        for label, searcher, args in runs:
+            budget = SearchBudget(seconds=seconds) if searcher is beam_stack_search else None
+            node, took, peak = peak_memory(searcher, problem, *args, budget=budget)
+            cost = node.path_cost if isinstance(node, Node) else getattr(node, 'reason', node)
+            print("{:<18} {:<24} cost {!s:<8} {:8.3f} s  peak {:8.1f} MB".format(
+                name, label, cost, took, peak / 2 ** 20))
+
+
+# ______________________________________________________________________________
+# Benchmark suite
+
+# family -> (instance names, algorithms run on every instance)
+SUITE = {
+    'EightPuzzle': (['depth-8', 'depth-16', 'depth-24'],
+                    [breadth_first_graph_search, bidirectional_breadth_first_search, greedy_search,
+                     astar_search, focal_search, iterative_deepening_astar_search, recursive_best_first_search]),
+    'NQueens': (['N-{}'.format(n) for n in (8, 12, 16, 20, 25, 30)],
+                [depth_first_graph_search]),
+    'WaterJug': (['4-3-2', '5-3-4', '8-5-4', '11-6-8', '13-7-10'],
+                 [breadth_first_graph_search, depth_first_graph_search, bidirectional_breadth_first_search,
+                  uniform_cost_search]),
+    'CountryMap': (['Lithuania', 'Romania', 'India', 'Russia', 'Ukraine'],
+                   [breadth_first_graph_search, uniform_cost_search, greedy_search, astar_search, focal_search,
+                    recursive_best_first_search, bidirectional_search]),
+    'RandomGraph': (['nodes-100', 'nodes-1000', 'nodes-3000'],
+                    [breadth_first_graph_search, uniform_cost_search, greedy_search, astar_search,
+                     focal_search, bidirectional_search]),
+}
+
+
+def make_problem(family, instance):
+    """Build the problem for a case of SUITE. Instances are fixed: random
+    choices are seeded from the instance name."""
+    if family == 'EightPuzzle':
+        # A state at exactly the given number of moves from the goal
+        depth = int(instance.split('-')[1])
+        problem = EightPuzzle((1, 2, 3, 4, 5, 6, 7, 8, 0))
+        table = DistanceTable.for_problem(problem)
+        rng = random.Random(depth)
+        while True:
+            state = problem.unrank(rng.randrange(problem.state_count))
+            if table.distance(state) == depth:
+                return EightPuzzle(state)
+    if family == 'NQueens':
+        return NQueensProblem(int(instance.split('-')[1]))
+    if family == 'WaterJug':
+        return WaterJugProblem(*map(int, instance.split('-')))
+    if family == 'CountryMap':
+        maps.romania_map = maps.romania_map_start = maps.romania_map_goal = None
+        search.switch_country_map(instance)
+        return GraphProblem(maps.romania_map_start, maps.romania_map_goal, maps.romania_map)
+    if family == 'RandomGraph':
+        # From the node nearest one corner to the node nearest the opposite one
+        random.seed(instance)
+        graph = RandomGraph(list(range(int(instance.split('-')[1]))), min_links=4)
+        corners = sorted(graph.locations, key=lambda node: sum(graph.locations[node]))
+        return GraphProblem(corners[0], corners[-1], graph)
+    raise ValueError('unknown problem family {}'.format(family))
+
+
+def measure(family, instance, searcher, repeat=5):
+    """One case: an instrumented run under tracemalloc for the counts and
+    peak memory, then repeat timed runs on the bare problem."""
+    problem = make_problem(family, instance)
+    instrumented = InstrumentedProblem(problem)
+    tracemalloc.start()
+    node = searcher(instrumented)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    wall_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        searcher(problem)
+        wall_times.append(time.perf_counter() - start)
+    wall_time = statistics.median(wall_times)
+    return {'expanded': instrumented.succs, 'goal_tests': instrumented.goal_tests,
+            'generated': instrumented.states, 'max_frontier': instrumented.max_frontier,
+            'max_explored': instrumented.max_explored,
+            'solution_cost': node.path_cost if isinstance(node, Node) else None,
+            'wall_times': wall_times, 'wall_time': wall_time,
+            'nodes_per_sec': instrumented.succs / wall_time if wall_time else None, 'peak_memory': peak}
+
+
+def _measure_worker(family, instance, searcher, repeat, conn):
+    try:
+        conn.send(('ok', measure(family, instance, searcher, repeat)))
+    except MemoryError:
+        conn.send(('OOM', {}))
+    except Exception as e:
+        conn.send((type(e).__name__, {}))
+
+
+def run_suite(families=None, repeat=5, timeout=60, output=None):
+    """Measure every case of SUITE (or of the given families), one at a time
+    in a fresh process that is killed after timeout seconds. Returns the
+    results, and writes them to output as JSON if given."""
+    results = []
+    for family in families or SUITE:
+        instances, searchers = SUITE[family]
+        for instance, searcher in itertools.product(instances, searchers):
+            here, there = multiprocessing.Pipe(duplex=False)
+            worker = multiprocessing.Process(target=_measure_worker,
+                                             args=(family, instance, searcher, repeat, there), daemon=True)
+            worker.start()
+            there.close()
+            if multiprocessing.connection.wait([here], timeout):
+                try:
+                    status, record = here.recv()
+                except EOFError:
+                    status, record = 'killed', {}
+            else:
+                worker.terminate()
+                status, record = 'timeout', {}
+            worker.join()
+            record = dict(family=family, instance=instance, algorithm=searcher.__name__, status=status, **record)
+            results.append(record)
+            print("{:<12} {:<12} {:<36} {:>8} {}".format(
+                family, instance, record['algorithm'], status,
+                '{:.4f} s'.format(record['wall_time']) if status == 'ok' else ''), flush=True)
+    data = {'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                     'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'repeat': repeat, 'timeout': timeout},
+            'results': results}
+    if output:
+        with open(output, 'w') as file:
+            json.dump(data, file, indent=1)
+    return data
+
+
+def permutation_p_value(before, after, samples=20000):
+    """One-sided p-value for the mean of after being larger than the mean of
+    before only by chance: the share of the ways to split the pooled times
+    into two such groups whose difference of means is at least the observed
+    one. All splits are counted when there are at most samples of them, and
+    samples random ones (with a fixed seed) otherwise."""
+    pooled, n = before + after, len(after)
+    observed = statistics.mean(after) - statistics.mean(before)
+    total = sum(pooled)
+
+    def difference(chosen):
+        picked = sum(pooled[i] for i in chosen)
+        return picked / n - (total - picked) / len(before)
+
+    indices = range(len(pooled))
+    if math.comb(len(pooled), n) <= samples:
+        splits = list(itertools.combinations(indices, n))
+    else:
+        rng = random.Random(0)
+        splits = [rng.sample(indices, n) for _ in range(samples)]
+    return sum(difference(chosen) >= observed - 1e-12 for chosen in splits) / len(splits)
+
+
+def compare(baseline, current, alpha=0.05, threshold=0.05):
+    """Print every case of current next to baseline, and return the cases
+    that got slower: the median wall time grew by more than threshold and
+    permutation_p_value is below alpha, or the case no longer completes."""
+    before = {(r['family'], r['instance'], r['algorithm']): r for r in baseline['results']}
+    slower = []
+    for record in current['results']:
+        key = (record['family'], record['instance'], record['algorithm'])
+        old = before.get(key)
+        if old is None:
+            continue
+        label = ' '.join(key)
+        if old['status'] != 'ok' or record['status'] != 'ok':
+            flagged = old['status'] == 'ok'
+            print("{:<64} {:>10} -> {:<10} {}".format(label, old['status'], record['status'],
+                                                     'SLOWER' if flagged else ''))
+        else:
+            ratio = record['wall_time'] / old['wall_time']
+            p = permutation_p_value(old['wall_times'], record['wall_times'])
+            flagged = ratio > 1 + threshold and p < alpha
+            print("{:<64} {:9.4f} s -> {:9.4f} s  x{:5.2f}  p={:.3f} {}".format(
+                label, old['wall_time'], record['wall_time'], ratio, p, 'SLOWER' if flagged else ''))
+        if flagged:
+            slower.append(key)
+    return slower
+
+
+def micro():
+    """The node size, expansion rate, hook overhead, anytime, focal and beam
+    search, and parallel search measurements."""
+    print("Node: {:.1f} bytes per node".format(node_bytes()))
+    for problem_class in (LegacyEightPuzzle, EightPuzzle):
+        print("{}: {:,.0f} expansions/s".format(problem_class.__name__, expansion_rate(problem_class)))
+    astar_vs_ida()
+    hooks_overhead()
+    anytime_profile()
+    focal_vs_astar()
+    beam_tradeoff()
+    parallel_bfs_speedup()
+    hda_star_speedup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks for search.py')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='run the benchmark suite')
+    run.add_argument('--family', action='append', choices=list(SUITE), help='only these problem families')
+    run.add_argument('--repeat', type=int, default=5, help='timed runs per case')
+    run.add_argument('--timeout', type=float, default=60, help='seconds allowed per case')
+    run.add_argument('--output', default='benchmark_results.json')
+    check = commands.add_parser('compare', help='flag slowdowns against a baseline')
+    check.add_argument('baseline')
+    check.add_argument('current')
+    check.add_argument('--alpha', type=float, default=0.05, help='significance level')
+    check.add_argument('--threshold', type=float, default=0.05, help='smallest relative slowdown flagged')
+    commands.add_parser('micro', help='node size, expansion rate, hooks, anytime/focal/beam search, parallel speedups')
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_suite(args.family, args.repeat, args.timeout, args.output)
+    elif args.command == 'compare':
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.current) as file:
+            current = json.load(file)
+        sys.exit(1 if compare(baseline, current, args.alpha, args.threshold) else 0)
+    else:
+        micro()